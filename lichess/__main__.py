@@ -0,0 +1,4 @@
+import sys
+from lichess.export import main
+
+sys.exit(main())
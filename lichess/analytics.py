@@ -0,0 +1,144 @@
+import itertools
+
+WHITE = 0
+BLACK = 1
+
+WIN = 0
+DRAW = 1
+LOSS = 2
+
+SPEEDS = ['ultraBullet', 'bullet', 'blitz', 'rapid', 'classical', 'correspondence']
+"""The speeds tracked by :class:`~lichess.analytics.PlayerStats`, in array order."""
+
+_SPEED_INDEX = dict((s, i) for i, s in enumerate(SPEEDS))
+_UNFINISHED = ('created', 'started', 'aborted', 'noStart', 'unknownFinish')
+_ECO_COUNT = 500
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError('Analytics require the numpy package to be installed')
+    return numpy
+
+def _player_id(player):
+    user = player.get('user')
+    if user is not None:
+        return user.get('id')
+    return player.get('userId')
+
+def eco_index(eco):
+    """Converts an ECO code (e.g. ``'B12'``) to its index in :data:`~lichess.analytics.PlayerStats.openings`, or None if it isn't valid."""
+    if not eco or len(eco) != 3 or eco[0] not in 'ABCDE' or not eco[1:].isdigit():
+        return None
+    return (ord(eco[0]) - ord('A')) * 100 + int(eco[1:])
+
+def eco_code(index):
+    """Converts an index in :data:`~lichess.analytics.PlayerStats.openings` back to its ECO code."""
+    return '{}{:02d}'.format(chr(ord('A') + index // 100), index % 100)
+
+
+class PlayerStats(object):
+    """Aggregates a player's games into compact arrays.
+
+    Games are consumed in batches of :data:`batch_size` and aggregated with vectorized operations.
+    Calling :meth:`update` again only processes the new games.
+    Requires the `numpy <https://numpy.org>`_ package.
+
+    :username: The player whose games are aggregated.
+    :batch_size: The number of games converted to arrays at a time.
+
+    >>> stats = lichess.analytics.PlayerStats('cyanfish')
+    >>> stats.update(lichess.api.user_games('cyanfish', opening='true'))
+    >>> print(stats.results[lichess.analytics.WHITE, lichess.analytics.SPEEDS.index('blitz')])
+    [412 37 398]
+    """
+
+    def __init__(self, username, batch_size=1000):
+        np = _numpy()
+        self.username = username.lower()
+        self.batch_size = batch_size
+        self.games = 0
+        """The number of games aggregated so far."""
+        self.results = np.zeros((2, len(SPEEDS), 3), dtype=np.int64)
+        """Game counts indexed by ``[colour, speed, outcome]``, where colour is :data:`WHITE` or :data:`BLACK`, speed is an index in :data:`SPEEDS` and outcome is :data:`WIN`, :data:`DRAW` or :data:`LOSS`."""
+        self.openings = np.zeros(_ECO_COUNT, dtype=np.int64)
+        """Game counts indexed by ECO code (see :func:`eco_index`). Requires games fetched with ``opening='true'``."""
+        self._history = []
+        self._history_cache = None
+
+    def update(self, games):
+        """Adds an enumerable of JSON games to the aggregates."""
+        games = iter(games)
+        while True:
+            batch = list(itertools.islice(games, self.batch_size))
+            if not batch:
+                break
+            self._add_batch(batch)
+
+    def _add_batch(self, batch):
+        np = _numpy()
+        colors, speeds, outcomes, ratings, times, ecos = [], [], [], [], [], []
+        for g in batch:
+            players = g.get('players', {})
+            if _player_id(players.get('white', {})) == self.username:
+                color, name, opponent = WHITE, 'white', 'black'
+            elif _player_id(players.get('black', {})) == self.username:
+                color, name, opponent = BLACK, 'black', 'white'
+            else:
+                continue
+            speed = _SPEED_INDEX.get(g.get('speed'))
+            if speed is None or g.get('status') in _UNFINISHED:
+                continue
+            winner = g.get('winner')
+            colors.append(color)
+            speeds.append(speed)
+            outcomes.append(WIN if winner == name else LOSS if winner == opponent else DRAW)
+            ratings.append(players[name].get('rating', -1))
+            times.append(g.get('createdAt', 0))
+            eco = eco_index(g.get('opening', {}).get('eco'))
+            ecos.append(-1 if eco is None else eco)
+        if not colors:
+            return
+
+        colors = np.array(colors, dtype=np.int64)
+        speeds = np.array(speeds, dtype=np.int64)
+        outcomes = np.array(outcomes, dtype=np.int64)
+        flat = (colors * len(SPEEDS) + speeds) * 3 + outcomes
+        self.results += np.bincount(flat, minlength=self.results.size).reshape(self.results.shape)
+
+        ecos = np.array(ecos, dtype=np.int64)
+        self.openings += np.bincount(ecos[ecos >= 0], minlength=_ECO_COUNT)
+
+        self._history.append((np.array(times, dtype=np.int64), np.array(ratings, dtype=np.int32), speeds.astype(np.int8)))
+        self._history_cache = None
+        self.games += len(colors)
+
+    def rating_history(self, speed=None):
+        """Returns a ``(timestamps, ratings)`` tuple of arrays sorted by time.
+
+        :speed: An optional speed name (e.g. ``'blitz'``) to restrict the curve to.
+
+        Timestamps are in milliseconds. Games without a rating are left out.
+        """
+        np = _numpy()
+        if self._history_cache is None:
+            if self._history:
+                times, ratings, speeds = (np.concatenate(a) for a in zip(*self._history))
+            else:
+                times, ratings, speeds = np.zeros(0, np.int64), np.zeros(0, np.int32), np.zeros(0, np.int8)
+            order = np.argsort(times, kind='stable')
+            self._history = [(times[order], ratings[order], speeds[order])]
+            self._history_cache = self._history[0]
+        times, ratings, speeds = self._history_cache
+        mask = ratings >= 0
+        if speed is not None:
+            mask &= speeds == _SPEED_INDEX[speed]
+        return times[mask], ratings[mask]
+
+    def top_openings(self, n=10):
+        """Returns a list of ``(eco, count)`` tuples for the :data:`n` most played openings."""
+        np = _numpy()
+        order = np.argsort(-self.openings, kind='stable')[:n]
+        return [(eco_code(int(i)), int(self.openings[i])) for i in order if self.openings[i] > 0]
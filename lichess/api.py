@@ -1,7 +1,11 @@
+import heapq
+import itertools
 import json
 import requests
+import threading
 import time
 from six.moves import urllib
+from requests.packages.urllib3.exceptions import ReadTimeoutError
 import lichess.format
 import lichess.auth
 
@@ -20,12 +24,137 @@ class ApiHttpError(ApiError):
     def __str__(self):
         return '{} {} {}'.format(self.http_status, self.url, self.response_text)
 
+class ApiTimeoutError(ApiError):
+    """The class for API exceptions caused by a timeout or an exceeded deadline.
+
+    The attributes describe how far the call got before it was abandoned.
+    """
+
+    def __init__(self, url, elapsed, retry_count=0, items=0, reason='Deadline exceeded'):
+        self.url = url
+        """The URL of the call."""
+        self.elapsed = elapsed
+        """The number of seconds spent on the call."""
+        self.retry_count = retry_count
+        """The number of retries made after rate-limiting or API downtime."""
+        self.items = items
+        """The number of streamed items received before the timeout."""
+        self.reason = reason
+
+    def __str__(self):
+        return '{} {} after {:.1f}s ({} retries, {} items)'.format(self.reason, self.url, self.elapsed, self.retry_count, self.items)
+
+INTERACTIVE = 0
+"""The priority of latency-sensitive calls. The default for calls that return a single object."""
+
+BULK = 1
+"""The priority of background calls. The default for calls that stream their results."""
+
+class RequestScheduler(object):
+    """Paces the requests of one or more clients within a shared rate budget, letting higher-priority calls go first.
+
+    :interval: The minimum number of seconds between two requests.
+    :reserved: The fraction of the budget reserved for :data:`~lichess.api.INTERACTIVE` calls while they are being made.
+        For :data:`linger` seconds after an interactive call, bulk calls are spaced at least ``interval / (1 - reserved)`` seconds apart, so interactive calls rarely have to wait.
+        Without interactive traffic, bulk calls use the whole budget.
+    :linger: The number of seconds the reservation lasts after an interactive call.
+
+    Waiting calls are started in priority order (lower numbers first), then in arrival order.
+    """
+
+    def __init__(self, interval=1, reserved=0.5, linger=10):
+        self.interval = interval
+        self.reserved = reserved
+        self.linger = linger
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._seq = itertools.count()
+        self._last = None
+        self._last_bulk = None
+        self._last_interactive = None
+        self._paused_until = None
+        self._stats = {}
+
+    def acquire(self, priority=INTERACTIVE, end=None):
+        """Blocks until a request with the given priority may start.
+
+        :end: An optional :func:`time.time` deadline.
+
+        Returns the number of seconds waited, or None if the request couldn't start before :data:`end`.
+        """
+        start = time.time()
+        entry = (priority, next(self._seq))
+        with self._cond:
+            heapq.heappush(self._waiting, entry)
+            self._cond.notify_all()
+            try:
+                while True:
+                    now = time.time()
+                    timeout = None
+                    if self._waiting[0] == entry:
+                        ready = now
+                        if self._last is not None:
+                            ready = max(ready, self._last + self.interval)
+                        if self._paused_until is not None:
+                            ready = max(ready, self._paused_until)
+                        if priority != INTERACTIVE and self._reserving(now):
+                            ready = max(ready, self._last_bulk + self.interval / (1.0 - self.reserved))
+                        if ready <= now:
+                            break
+                        if end is not None and ready > end:
+                            return None
+                        timeout = ready - now
+                    if end is not None:
+                        if now >= end:
+                            return None
+                        timeout = end - now if timeout is None else min(timeout, end - now)
+                    self._cond.wait(timeout)
+                heapq.heappop(self._waiting)
+                self._last = now
+                if priority != INTERACTIVE:
+                    self._last_bulk = now
+                else:
+                    self._last_interactive = now
+            finally:
+                if entry in self._waiting:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                self._cond.notify_all()
+            waited = now - start
+            stats = self._stats.setdefault(priority, {'count': 0, 'totalWait': 0.0, 'maxWait': 0.0})
+            stats['count'] += 1
+            stats['totalWait'] += waited
+            stats['maxWait'] = max(stats['maxWait'], waited)
+            return waited
+
+    def pause_until(self, end):
+        """Holds back all calls until the :func:`time.time` timestamp :data:`end`, e.g. after the server asked clients to slow down."""
+        with self._cond:
+            self._paused_until = max(end, self._paused_until or end)
+            self._cond.notify_all()
+
+    def _reserving(self, now):
+        # Only slow down bulk calls while interactive ones are being made, so the reservation doesn't waste the budget
+        return (self._last_bulk is not None and self.reserved < 1 and
+                self._last_interactive is not None and now - self._last_interactive < self.linger)
+
+    def stats(self):
+        """Returns the queue wait per priority, as a dict mapping each priority to ``count``, ``totalWait``, ``maxWait`` and ``waiting`` (the number of calls currently queued)."""
+        with self._cond:
+            result = {}
+            for priority, stats in self._stats.items():
+                result[priority] = dict(stats, waiting=0)
+            for priority, _ in self._waiting:
+                result.setdefault(priority, {'count': 0, 'totalWait': 0.0, 'maxWait': 0.0, 'waiting': 0})['waiting'] += 1
+            return result
+
 class DefaultApiClient(object):
     """
     The default API client, with immediate HTTP calls and basic rate-limiting functionality.
     """
 
-    _first_call = True
+    scheduler = RequestScheduler()
+    """The :class:`~lichess.api.RequestScheduler` that paces calls. Shared by all clients unless one is passed to the constructor."""
 
     base_url = 'https://lichess.org/'
     """The base lichess API URL.
@@ -36,57 +165,132 @@ class DefaultApiClient(object):
     max_retries = -1
     """The maximum number of retries after rate-limiting before an exception is raised. -1 for infinite retries."""
 
-    def __init__(self, base_url=None, max_retries=None):
+    connect_timeout = 10
+    """The maximum number of seconds to wait for a connection to the server."""
+
+    read_timeout = 60
+    """The maximum number of seconds to wait for a (non-streamed) response."""
+
+    idle_timeout = 60
+    """The maximum number of seconds to wait between chunks of a streamed response."""
+
+    pipeline_chunk_size = 1 << 16
+    """The number of bytes read at a time by the background reader of pipelined calls."""
+
+    deadline = None
+    """The default maximum number of seconds an entire call may take, including rate-limiting delays, retries and streaming. None for no deadline."""
+
+    def __init__(self, base_url=None, max_retries=None, connect_timeout=None, read_timeout=None, idle_timeout=None, deadline=None, scheduler=None):
+        if scheduler is not None:
+            self.scheduler = scheduler
         if base_url is not None:
             self.base_url = base_url
         if max_retries is not None:
             self.max_retries = max_retries
-
-    def call(self, path, params=None, post_data=None, auth=None, format=lichess.format.JSON, object_type=lichess.format.PUBLIC_API_OBJECT):
+        if connect_timeout is not None:
+            self.connect_timeout = connect_timeout
+        if read_timeout is not None:
+            self.read_timeout = read_timeout
+        if idle_timeout is not None:
+            self.idle_timeout = idle_timeout
+        if deadline is not None:
+            self.deadline = deadline
+
+    def call(self, path, params=None, post_data=None, auth=None, format=lichess.format.JSON, object_type=lichess.format.PUBLIC_API_OBJECT, deadline=None, idle_timeout=None, priority=None, pipeline=None):
         """Makes an API call, prepending :data:`~lichess.api.DefaultApiClient.base_url` to the provided path. HTTP GET is used unless :data:`post_data` is provided.
 
-        Consecutive calls use a 1s delay.
-        If HTTP 429 is received, retries after a 1min delay.
+        Consecutive calls are spaced by the :data:`~lichess.api.DefaultApiClient.scheduler` (1s apart by default), which starts waiting calls by :data:`priority`.
+        The priority defaults to :data:`~lichess.api.BULK` for streamed results and :data:`~lichess.api.INTERACTIVE` otherwise.
+        If HTTP 429 is received, retries after a 1min delay, during which the scheduler holds back all other calls.
+
+        If the call (including delays, retries and reading a streamed response) takes longer than :data:`deadline` seconds,
+        or a connection or read times out, :class:`~lichess.api.ApiTimeoutError` is raised.
+        :data:`idle_timeout` overrides :data:`~lichess.api.DefaultApiClient.idle_timeout` for this call.
+
+        If :data:`pipeline` is set, a streamed response is read on a background thread that buffers up to that many chunks
+        (see :class:`~lichess.format.PipelinedResponse`), so network reads overlap with parsing and processing.
         """
-        if DefaultApiClient._first_call:
-            DefaultApiClient._first_call = False
-        else:
-            time.sleep(1)
+        if deadline is None:
+            deadline = self.deadline
+        start = time.time()
+        end = start + deadline if deadline is not None else None
+        url = urllib.parse.urljoin(self.base_url, path)
+        retry_count = 0
+
+        def wait(seconds):
+            if end is not None and time.time() + seconds > end:
+                raise ApiTimeoutError(url, time.time() - start, retry_count)
+            time.sleep(seconds)
+
+        stream = format.stream(object_type)
+        if priority is None:
+            priority = BULK if stream else INTERACTIVE
+        if self.scheduler.acquire(priority, end) is None:
+            raise ApiTimeoutError(url, time.time() - start, retry_count)
 
         if auth is None:
             auth = lichess.auth.EMPTY
         elif isinstance(auth, str):
             auth = lichess.auth.OAuthToken(auth)
         headers = auth.headers()
-        stream = format.stream(object_type)
         content_type = format.content_type(object_type)
         if content_type:
             headers['Accept'] = content_type
         cookies = auth.cookies()
 
-        retry_count = 0
         while True:
-            url = urllib.parse.urljoin(self.base_url, path)
-            if post_data:
-                resp = requests.post(url, params=params, data=post_data, headers=headers, cookies=cookies, stream=stream)
-            else:
-                resp = requests.get(url, params, headers=headers, cookies=cookies, stream=stream)
-
+            read_timeout = (idle_timeout or self.idle_timeout) if stream else self.read_timeout
+            if end is not None:
+                read_timeout = max(min(read_timeout, end - time.time()), 0.001)
+            timeout = (self.connect_timeout, read_timeout)
+            try:
+                if post_data:
+                    resp = requests.post(url, params=params, data=post_data, headers=headers, cookies=cookies, stream=stream, timeout=timeout)
+                else:
+                    resp = requests.get(url, params, headers=headers, cookies=cookies, stream=stream, timeout=timeout)
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                if _is_timeout(e):
+                    raise ApiTimeoutError(url, time.time() - start, retry_count, reason='Timed out')
+                raise
+
+            if resp.status_code in (429, 502, 503):
+                resp.close()
             if resp.status_code == 429:
                 self.on_rate_limit(url, retry_count)
-                time.sleep(60)
+                # Lichess asks clients to pause all requests for a minute, so hold back other threads sharing the scheduler too
+                self.scheduler.pause_until(time.time() + 60)
+                wait(60)
                 retry_count += 1
             elif resp.status_code == 502 or resp.status_code == 503:
                 self.on_api_down(retry_count)
-                time.sleep(60)
+                wait(60)
                 retry_count += 1
             else:
                 break
 
         if resp.status_code != 200:
-            raise ApiHttpError(resp.status_code, url, resp.text)
-
-        return format.parse(object_type, resp)
+            try:
+                raise ApiHttpError(resp.status_code, url, resp.text)
+            finally:
+                resp.close()
+
+        if isinstance(format, lichess.format.Raw):
+            # Raw reads the whole body while parsing, so the deadline is checked per chunk
+            resp = _TimedResponse(resp, url, start, end, retry_count)
+        if pipeline and stream:
+            resp = lichess.format.PipelinedResponse(resp, pipeline, self.pipeline_chunk_size)
+        try:
+            result = format.parse(object_type, resp)
+        except requests.exceptions.Timeout:
+            resp.close()
+            raise ApiTimeoutError(url, time.time() - start, retry_count, reason='Timed out')
+        except Exception:
+            # Also stops the background reader of a pipelined response
+            resp.close()
+            raise
+        if isinstance(result, lichess.format.Stream):
+            result = lichess.format.Stream(_timed_stream(result, url, start, end, retry_count))
+        return result
 
     def on_rate_limit(self, url, retry_count):
         """A handler called when HTTP 429 is received.
@@ -110,20 +314,87 @@ default_client = DefaultApiClient()
 Initially set to an instance of :class:`~lichess.api.DefaultApiClient`.
 """
 
+default_store = None
+"""The :class:`~lichess.store.ObjectStore` consulted by :data:`~lichess.api.games_by_ids` and :data:`~lichess.api.users_by_ids`, or None to always fetch.
+
+Can be overridden with the :data:`store` parameter in those methods.
+"""
+
 
 # Helpers for API functions
 
+def _is_timeout(e):
+    # Read timeouts while streaming surface as a ConnectionError wrapping urllib3's ReadTimeoutError
+    return isinstance(e, requests.exceptions.Timeout) or isinstance(e.args[0] if e.args else None, ReadTimeoutError)
+
+def _timed_stream(stream, url, start, end, retry_count):
+    items = 0
+    try:
+        while True:
+            try:
+                obj = next(stream)
+            except StopIteration:
+                return
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                if _is_timeout(e):
+                    raise ApiTimeoutError(url, time.time() - start, retry_count, items, reason='Timed out')
+                raise
+            if end is not None and time.time() > end:
+                raise ApiTimeoutError(url, time.time() - start, retry_count, items)
+            items += 1
+            yield obj
+    finally:
+        stream.close()
+
+class _TimedResponse(object):
+    """Wraps a streamed response so reading its content raises :class:`ApiTimeoutError` on a read timeout or when the deadline is exceeded."""
+
+    def __init__(self, resp, url, start, end, retry_count):
+        self._resp = resp
+        self._url = url
+        self._start = start
+        self._end = end
+        self._retry_count = retry_count
+
+    def __getattr__(self, name):
+        return getattr(self._resp, name)
+
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        chunks = self._resp.iter_content(chunk_size, decode_unicode)
+        while True:
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                return
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                if _is_timeout(e):
+                    raise ApiTimeoutError(self._url, time.time() - self._start, self._retry_count, reason='Timed out')
+                raise
+            if self._end is not None and time.time() > self._end:
+                raise ApiTimeoutError(self._url, time.time() - self._start, self._retry_count)
+            yield chunk
+
+    def close(self):
+        self._resp.close()
+
 def _api_get(path, params, object_type=lichess.format.PUBLIC_API_OBJECT):
-    client = params.pop('client', default_client)
-    auth = params.pop('auth', lichess.auth.EMPTY)
-    format = params.pop('format', lichess.format.JSON)
-    return client.call(path, params, auth=auth, format=format, object_type=object_type)
+    return _api_call(path, params, None, object_type)
 
 def _api_post(path, params, post_data, object_type=lichess.format.PUBLIC_API_OBJECT):
+    return _api_call(path, params, post_data, object_type)
+
+def _api_call(path, params, post_data, object_type):
     client = params.pop('client', default_client)
-    auth = params.pop('auth', lichess.auth.EMPTY)
-    format = params.pop('format', lichess.format.JSON)
-    return client.call(path, params, post_data, auth=auth, format=format, object_type=object_type)
+    options = {
+        'auth': params.pop('auth', lichess.auth.EMPTY),
+        'format': params.pop('format', lichess.format.JSON),
+        'object_type': object_type,
+    }
+    # Only passed when given, so custom clients without timeout support keep working
+    for option in ('deadline', 'idle_timeout', 'priority', 'pipeline'):
+        if option in params:
+            options[option] = params.pop(option)
+    return client.call(path, params, post_data, **options)
 
 def _enum(fn, args, kwargs):
     if 'nb' not in kwargs:
@@ -139,19 +410,172 @@ def _enum(fn, args, kwargs):
             break
         kwargs['page'] += 1
 
-def _batch(fn, args, kwargs, batch_size):
+def _validate_batch_args(args):
     if len(args) == 0:
         raise ValueError('A positional argument must be supplied')
     if not isinstance(args[0], list):
         raise ValueError('First argument must be a list')
+
+def _batch(fn, args, kwargs, batch_size):
+    _validate_batch_args(args)
+    return lichess.format.Stream(_batch_results(fn, args, kwargs, batch_size))
+
+def _batch_results(fn, args, kwargs, batch_size):
     args = list(args)
     remaining = args[0]
     while len(remaining) > 0:
         args[0] = remaining[:batch_size]
         remaining = remaining[batch_size:]
         results = fn(*args, **kwargs)
-        for obj in results:
-            yield obj
+        try:
+            for obj in results:
+                yield obj
+        finally:
+            if hasattr(results, 'close'):
+                results.close()
+
+def _raw_batch(fn, ids, kwargs, batch_size, raw):
+    """Like :func:`_batch` for the :class:`~lichess.format.Raw` format: every batch is written to the same target, and the counts are summed."""
+    _validate_batch_args([ids])
+    if raw.resume:
+        raise ValueError('Resuming a Raw export is only supported for user games; pass the ids that are still missing instead')
+    with raw._shared() as (target, resumed):
+        result = {'bytes': 0, 'games': 0, 'resumedGames': resumed}
+        for n in range(0, len(ids), batch_size):
+            written = fn(ids[n:n + batch_size], **dict(kwargs, format=target))
+            result['bytes'] += written['bytes']
+            result['games'] += written['games']
+    return result
+
+def _stored(ids, fn, kwargs, batch_size, get, put, key):
+    """Like :func:`_batch`, but only fetches the objects missing from a store. Results are yielded in the order of the ids.
+
+    The ids are scanned until a batch of missing ones is found, and the batch is fetched while yielding whatever is next in order,
+    so only objects that arrive before their turn are held back.
+    """
+    done = scanned = 0
+    while done < len(ids):
+        held = {}
+        missing = []
+        while scanned < len(ids) and len(missing) < batch_size:
+            obj = get(ids[scanned])
+            if obj is None:
+                missing.append(ids[scanned])
+            else:
+                held[key(ids[scanned])] = obj
+            scanned += 1
+        pending = set(key(i) for i in missing)
+        results = None
+        try:
+            while True:
+                while done < scanned:
+                    k = key(ids[done])
+                    if k in pending:
+                        break
+                    if k in held:
+                        yield held[k]
+                    done += 1
+                else:
+                    break
+                if results is None:
+                    results = fn(missing, **kwargs)
+                    it = iter(results)
+                obj = next(it, None)
+                if obj is None:
+                    # The rest of the batch wasn't returned (e.g. unknown ids)
+                    pending.clear()
+                    continue
+                put(obj)
+                k = key(obj['id'])
+                pending.discard(k)
+                held[k] = obj
+        finally:
+            if hasattr(results, 'close'):
+                results.close()
+
+_CALL_OPTIONS = ('client', 'auth', 'format', 'deadline', 'idle_timeout', 'priority', 'pipeline')
+
+def _store_for(kwargs):
+    store = kwargs.pop('store', default_store)
+    if kwargs.get('format', lichess.format.JSON) is not lichess.format.JSON:
+        return None
+    # Stored objects are keyed by id only, so query parameters (e.g. evals or clocks) that change the response bypass the store
+    if any(k not in _CALL_OPTIONS for k in kwargs):
+        return None
+    return store
+
+def _event_fen(event):
+    if 'd' in event:
+        event = event['d']
+    return event.get('fen')
+
+def _game_over(event):
+    status = event.get('status')
+    if isinstance(status, dict):
+        status = status.get('name')
+    return 'winner' in event or (status is not None and status not in ('created', 'started'))
+
+def _live(path, params, finished=None):
+    """Streams events from a long-lived endpoint, reconnecting when the connection fails, stalls or ends.
+
+    The stream stops when it ends after an event for which :data:`finished` returns True.
+    After reconnecting, the server starts with the current state; events that repeat the last position seen are dropped.
+    """
+    params.setdefault('idle_timeout', 20)
+    # Live streams are latency-sensitive, so reconnects don't queue behind bulk exports
+    params.setdefault('priority', INTERACTIVE)
+    max_reconnects = params.pop('max_reconnects', -1)
+    failures = 0
+    last_fen = None
+    last_event = None
+    while True:
+        resumed = last_fen is not None
+        try:
+            with _api_get(path, dict(params), object_type=lichess.format.EVENT_STREAM_OBJECT) as events:
+                for event in events:
+                    failures = 0
+                    last_event = event
+                    fen = _event_fen(event)
+                    if resumed and fen is not None and fen == last_fen:
+                        continue
+                    resumed = False
+                    if fen is not None:
+                        last_fen = fen
+                    yield event
+            # A proxy or the server may close a long-lived connection cleanly, so only stop when the stream is really over
+            if finished is not None and last_event is not None and finished(last_event):
+                return
+            if max_reconnects != -1 and failures >= max_reconnects:
+                return
+        except (ApiTimeoutError, requests.exceptions.RequestException):
+            if max_reconnects != -1 and failures >= max_reconnects:
+                raise
+        time.sleep(min(2 ** failures - 1, 60))
+        failures += 1
+
+def _concurrent_map(fn, items, workers, stop=None):
+    """Like :func:`map`, but runs up to :data:`workers` calls at a time. Results are yielded in order.
+
+    If :data:`stop` is given, it's called when the map ends (including by an exception such as :class:`KeyboardInterrupt`), and the running calls are waited for.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    items = iter(items)
+    executor = ThreadPoolExecutor(max_workers=max(workers, 1))
+    pending = []
+    try:
+        for item in itertools.islice(items, workers):
+            pending.append(executor.submit(fn, item))
+        while pending:
+            result = pending.pop(0).result()
+            for item in itertools.islice(items, 1):
+                pending.append(executor.submit(fn, item))
+            yield result
+    finally:
+        for future in pending:
+            future.cancel()
+        if stop is not None:
+            stop()
+        executor.shutdown(wait=stop is not None)
 
 # Actual public API functions
 
@@ -185,8 +609,15 @@ def users_by_ids(ids, **kwargs):
     >>> ratings = [u.get('perfs', {}).get('blitz', {}).get('rating') for u in users]
     >>> print(ratings)
     [1617, 1948]
+
+    If a :data:`store` (or :data:`~lichess.api.default_store`) is set, only users missing from it are requested.
+    The store isn't used when extra query parameters are given.
     """
-    return _batch(users_by_ids_page, [ids], kwargs, 300)
+    store = _store_for(kwargs)
+    if store is None:
+        return _batch(users_by_ids_page, [ids], kwargs, 300)
+    _validate_batch_args([ids])
+    return lichess.format.Stream(_stored(ids, users_by_ids_page, kwargs, 300, store.get_user, store.put_user, lambda i: i.lower()))
 
 def users_by_ids_page(ids, **kwargs):
     """Wrapper for the `POST /api/users <https://github.com/ornicar/lila#post-apiusers-fetch-many-users-by-id>`_ endpoint.
@@ -249,8 +680,21 @@ def game(game_id, **kwargs):
 
 def games_by_ids(ids, **kwargs):
     """Wrapper for the `POST /games/export/_ids <https://github.com/ornicar/lila#post-apigames-fetch-many-games-by-id>`_ endpoint.
-    Returns a generator that splits the IDs into multiple requests as needed."""
-    return _batch(games_by_ids_page, [ids], kwargs, 300)
+    Returns a generator that splits the IDs into multiple requests as needed.
+
+    If a :data:`store` (or :data:`~lichess.api.default_store`) is set, only games missing from it are requested, and the games are returned in the order of the IDs.
+    Only the default JSON format without extra query parameters uses the store.
+
+    With the :class:`~lichess.format.Raw` format, all batches are written to the same file and the summed counts are returned.
+    Resuming (``resume=True``) isn't supported here, since the ids of the games already written aren't known.
+    """
+    if isinstance(kwargs.get('format'), lichess.format.Raw):
+        return _raw_batch(games_by_ids_page, ids, kwargs, 300, kwargs['format'])
+    store = _store_for(kwargs)
+    if store is None:
+        return _batch(games_by_ids_page, [ids], kwargs, 300)
+    _validate_batch_args([ids])
+    return lichess.format.Stream(_stored(ids, games_by_ids_page, kwargs, 300, store.get_game, store.put_game, lambda i: i))
 
 def games_by_ids_page(ids, **kwargs):
     """Wrapper for the `POST /games/export/_ids <https://github.com/ornicar/lila#post-apigames-fetch-many-games-by-id>`_ endpoint.
@@ -298,6 +742,31 @@ def current_game(username, **kwargs):
     Returns a single game."""
     return _api_get('/api/user/{}/current-game'.format(username), kwargs, object_type=lichess.format.GAME_OBJECT)
 
+def game_stream(game_id, **kwargs):
+    """Wrapper for the `GET /api/stream/game/<id> <https://lichess.org/api#operation/streamGame>`_ endpoint.
+
+    Returns a :class:`~lichess.format.Stream` of events: the full game first, then one event per move (with ``fen`` and ``lm`` keys) until the game ends.
+    If the connection drops, ends before the game is over, or no data (including keep-alives) arrives for :data:`idle_timeout` seconds (20 by default),
+    it reconnects and continues without repeating events.
+    Use :data:`max_reconnects` to limit the number of consecutive reconnection attempts.
+
+    >>> for event in lichess.api.game_stream('Qa7FJNk2'):
+    >>>     print(event['fen'])
+    """
+    return lichess.format.Stream(_live('/api/stream/game/{}'.format(game_id), kwargs, finished=_game_over))
+
+def tv_feed(**kwargs):
+    """Wrapper for the `GET /api/tv/feed <https://lichess.org/api#operation/tvFeed>`_ endpoint.
+
+    Returns a :class:`~lichess.format.Stream` of events that never ends: a ``featured`` event when a new game is featured, then ``fen`` events for each move.
+    Like :data:`~lichess.api.game_stream`, it reconnects when the connection drops or stalls.
+
+    >>> for event in lichess.api.tv_feed():
+    >>>     if event['t'] == 'featured':
+    >>>         print(event['d']['id'])
+    """
+    return lichess.format.Stream(_live('/api/tv/feed', kwargs))
+
 def tournaments(**kwargs):
     """Wrapper for the `GET /api/tournament <https://github.com/ornicar/lila#get-apitournament-fetch-current-tournaments>`_ endpoint."""
     return _api_get('/api/tournament', kwargs)
@@ -306,10 +775,32 @@ def tournament(tournament_id, **kwargs):
     """Wrapper for the `GET /api/tournament/<tournamentId> <https://github.com/ornicar/lila#get-apitournamenttournamentid-fetch-one-tournament>`_ endpoint."""
     return _api_get('/api/tournament/{}'.format(tournament_id), kwargs)
 
-def tournament_standings(tournament_id, **kwargs):
+def tournament_standings(tournament_id, workers=1, **kwargs):
     """Wrapper for the `GET /api/tournament/<tournamentId> <https://github.com/ornicar/lila#get-apitournamenttournamentid-fetch-one-tournament>`_ endpoint.
-    Returns a generator that makes requests for additional pages as needed."""
-    kwargs['page'] = 1
+    Returns a generator that makes requests for additional pages as needed.
+
+    :workers: The number of pages to fetch concurrently. If more than 1, the first page is used to find the page count and the remaining pages are fetched in parallel.
+
+    >>> stands = lichess.api.tournament_standings('winter17', workers=4)
+    >>> print(next(stands)['name'])
+    Lance5500
+    """
+    if workers > 1:
+        first = tournament(tournament_id, page=1, **kwargs)
+        players = first['standing']['players']
+        for obj in players:
+            yield obj
+        if len(players) == 0:
+            return
+        page_count = (first.get('nbPlayers', 0) + len(players) - 1) // len(players)
+        fetch = lambda page: tournament_standings_page(tournament_id, page=page, **kwargs)['players']
+        for page_players in _concurrent_map(fetch, range(2, page_count + 1), workers):
+            for obj in page_players:
+                yield obj
+        # Players may have joined since the first page, so keep reading until an empty page like the serial path
+        kwargs['page'] = max(page_count, 1) + 1
+    else:
+        kwargs['page'] = 1
     while True:
         pag = tournament_standings_page(tournament_id, **kwargs)
         for obj in pag['players']:
@@ -318,6 +809,48 @@ def tournament_standings(tournament_id, **kwargs):
             break
         kwargs['page'] += 1
 
+def tournament_standings_live(tournament_id, pages=1, interval=5, workers=1, **kwargs):
+    """Polls the top standings of a tournament and yields what changed.
+
+    :pages: The number of standings pages (from the top) to refresh each time.
+    :interval: The delay in seconds between refreshes.
+    :workers: The number of pages to fetch concurrently.
+
+    Returns a generator that yields a list of changes each time the refreshed standings differ from the previous refresh.
+    Each change is a dict with ``name``, ``rank``, ``score``, ``previousRank`` and ``previousScore`` keys.
+    New players have ``previousRank`` set to None, and players that dropped out of the refreshed pages have ``rank`` set to None.
+    The generator stops after the tournament is finished.
+
+    >>> for changes in lichess.api.tournament_standings_live('winter17'):
+    >>>     for c in changes:
+    >>>         print(c['name'], c['previousRank'], '->', c['rank'])
+    """
+    previous = {}
+    while True:
+        first = tournament(tournament_id, page=1, **kwargs)
+        players = list(first['standing']['players'])
+        fetch = lambda page: tournament_standings_page(tournament_id, page=page, **kwargs)['players']
+        for page_players in _concurrent_map(fetch, range(2, pages + 1), workers):
+            players.extend(page_players)
+
+        current = dict((p['name'], p) for p in players)
+        changes = []
+        for p in players:
+            old = previous.get(p['name'])
+            if old is None or old['rank'] != p['rank'] or old['score'] != p['score']:
+                changes.append({'name': p['name'], 'rank': p['rank'], 'score': p['score'],
+                                'previousRank': old and old['rank'], 'previousScore': old and old['score']})
+        for name, old in previous.items():
+            if name not in current:
+                changes.append({'name': name, 'rank': None, 'score': None,
+                                'previousRank': old['rank'], 'previousScore': old['score']})
+        previous = current
+        if changes:
+            yield changes
+        if first.get('isFinished'):
+            break
+        time.sleep(interval)
+
 def tournament_standings_page(tournament_id, **kwargs):
     """Wrapper for the `GET /api/tournament/<tournamentId> <https://github.com/ornicar/lila#get-apitournamenttournamentid-fetch-one-tournament>`_ endpoint.
     Use :data:`~lichess.api.tournament_standings` to avoid manual pagination.
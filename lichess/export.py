@@ -0,0 +1,261 @@
+"""A command-line tool to export games in bulk.
+
+Run ``python -m lichess --help`` (or ``lichess-export --help``) for usage.
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import threading
+import time
+import lichess.api
+import lichess.format
+
+
+def _open_output(path, append):
+    mode = 'at' if append else 'wt'
+    if path == '-':
+        return sys.stdout
+    if path.endswith('.gz'):
+        import gzip
+        return gzip.open(path, mode)
+    if path.endswith('.bz2'):
+        import bz2
+        return bz2.open(path, mode)
+    if path.endswith('.xz'):
+        import lzma
+        return lzma.open(path, mode)
+    return io.open(path, mode[0], encoding='utf-8')
+
+
+class Progress(object):
+    """Tracks exported games, saves resumable state and reports throughput.
+
+    :path: The progress file, or None to disable resuming.
+    :out: The output file object, flushed before each save so the state never gets ahead of the output.
+    :interval: The number of seconds between reports on stderr (0 to disable).
+    """
+
+    def __init__(self, path, out, interval=5):
+        self.path = path
+        self.out = out
+        self.interval = interval
+        self.state = {'users': {}, 'batches': []}
+        if path is not None and os.path.exists(path):
+            with io.open(path, encoding='utf-8') as fin:
+                self.state = json.load(fin)
+        self.games = 0
+        self.bytes = 0
+        self.start = time.time()
+        self.stopping = threading.Event()
+        """Set when the export is interrupted; workers stop after the game they are writing and save their state."""
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._reporter = None
+
+    def write(self, text):
+        with self._lock:
+            self.out.write(text)
+            self.games += 1
+            self.bytes += len(text)
+
+    def update(self, section, key, value):
+        """Records progress for a user, a partially written batch or a finished batch, then saves the state."""
+        with self._lock:
+            if section == 'batches':
+                self.state['batches'].append(key)
+                self.state.get('partial', {}).pop(str(key), None)
+            else:
+                self.state.setdefault(section, {})[key] = value
+            self.save()
+
+    def save(self):
+        if self.path is None:
+            return
+        self.out.flush()
+        tmp = self.path + '.tmp'
+        with io.open(tmp, 'w', encoding='utf-8') as fout:
+            fout.write(json.dumps(self.state))
+        getattr(os, 'replace', os.rename)(tmp, self.path)
+
+    def report(self, final=False):
+        elapsed = max(time.time() - self.start, 1e-6)
+        sys.stderr.write('{}{} games, {:.1f} games/s, {:.1f} MB, {:.0f}s{}'.format(
+            '' if final else '\r', self.games, self.games / elapsed, self.bytes / 1e6, elapsed, '\n' if final else ''))
+        sys.stderr.flush()
+
+    def __enter__(self):
+        if self.interval > 0:
+            def run():
+                while not self._stopped.wait(self.interval):
+                    self.report()
+            self._reporter = threading.Thread(target=run)
+            self._reporter.daemon = True
+            self._reporter.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stopped.set()
+        with self._lock:
+            self.save()
+        if self.interval > 0:
+            self.report(final=True)
+
+
+class _Output(object):
+    """How games are requested, written and identified for an output format.
+
+    PGN is requested from the API as is, rather than converted from JSON, so clocks, evaluations and results are kept.
+    """
+
+    def __init__(self, name):
+        if name == 'pgn':
+            self.api_format = lichess.format.PGN
+            # PGN only has the time to the second
+            self.resolution = 1000
+        else:
+            self.api_format = lichess.format.JSON
+            self.resolution = 1
+        self.name = name
+
+    def render(self, game):
+        if self.name == 'pgn':
+            return game.rstrip('\n') + '\n\n\n'
+        return json.dumps(game) + '\n'
+
+    def game_id(self, game):
+        if self.name == 'pgn':
+            game_id = lichess.format._pgn_id(game.encode('utf-8'))
+            return game_id and game_id.decode('ascii')
+        return game['id']
+
+    def created_at(self, game):
+        if self.name == 'pgn':
+            return lichess.format._pgn_time(game.encode('utf-8'))
+        return game['createdAt']
+
+def _export_user(username, args, progress, output):
+    state = progress.state['users'].get(username, {})
+    if state.get('done'):
+        return
+    done = state.get('games', 0)
+    params = {'auth': args.token, 'format': output.api_format}
+    if args.perf_type:
+        params['perfType'] = args.perf_type
+    if args.since is not None:
+        params['since'] = args.since
+    if args.max is not None:
+        if done >= args.max:
+            return
+        # Games of the last written time that were already written are requested again, then skipped
+        params['max'] = args.max - done + len(state.get('skip', []))
+    if 'until' in state:
+        params['until'] = state['until']
+    elif args.until is not None:
+        params['until'] = args.until
+
+    # Games are streamed newest first, so resume from the time of the oldest written game (inclusive, since several games
+    # can share a time at the output's resolution) and skip the games of that time that were already written
+    state = dict(state)
+    skip = set(state.get('skip', []))
+    try:
+        with lichess.api.user_games(username, **params) as games:
+            for g in games:
+                game_id = output.game_id(g)
+                if game_id in skip:
+                    continue
+                if args.max is not None and done >= args.max:
+                    break
+                progress.write(output.render(g))
+                done += 1
+                created = output.created_at(g)
+                if created is None:
+                    state = dict(state, games=done)
+                else:
+                    until = created + output.resolution - 1
+                    ids = state.get('skip', []) + [game_id] if state.get('until') == until else [game_id]
+                    state = {'games': done, 'until': until, 'skip': ids}
+                if progress.stopping.is_set():
+                    return
+                if done % args.save_every == 0:
+                    progress.update('users', username, state)
+        state['done'] = True
+    finally:
+        progress.update('users', username, state)
+
+def _export_batch(index, ids, args, progress, output):
+    # Games of an interrupted batch that were already written are skipped
+    written = list(progress.state.get('partial', {}).get(str(index), []))
+    skip = set(written)
+    remaining = [i for i in ids if i not in skip]
+    finished = False
+    try:
+        if remaining:
+            with lichess.api.games_by_ids(remaining, auth=args.token, format=output.api_format) as games:
+                for g in games:
+                    progress.write(output.render(g))
+                    written.append(output.game_id(g))
+                    if progress.stopping.is_set():
+                        return
+                    if len(written) % args.save_every == 0:
+                        progress.update('partial', str(index), list(written))
+        progress.update('batches', index, None)
+        finished = True
+    finally:
+        if not finished:
+            progress.update('partial', str(index), list(written))
+
+def main(argv=None):
+    """The entry point for ``python -m lichess`` and the ``lichess-export`` command."""
+    parser = argparse.ArgumentParser(prog='lichess-export', description='Export lichess games in bulk.')
+    parser.add_argument('source', choices=['user', 'ids'], help='export the games of users, or games by id')
+    parser.add_argument('targets', nargs='+', help='usernames, or files with one game id per line (- for stdin)')
+    parser.add_argument('-o', '--output', default='-', help='output file; .gz, .bz2 and .xz are compressed (default: stdout)')
+    parser.add_argument('-f', '--format', choices=['ndjson', 'pgn'], default='ndjson', help='output format (default: ndjson)')
+    parser.add_argument('-p', '--progress-file', help='file to save progress to, so an interrupted export can be resumed')
+    parser.add_argument('-w', '--workers', type=int, default=1, help='number of concurrent requests (default: 1)')
+    parser.add_argument('--token', help='OAuth token, for faster downloads')
+    parser.add_argument('--max', type=int, help='maximum number of games per user')
+    parser.add_argument('--since', type=int, help='only games played since this timestamp (ms)')
+    parser.add_argument('--until', type=int, help='only games played until this timestamp (ms)')
+    parser.add_argument('--perf-type', help='only games of these speeds or variants, comma-separated')
+    parser.add_argument('--save-every', type=int, default=100, help='games between progress saves (default: 100)')
+    parser.add_argument('--report-interval', type=float, default=5, help='seconds between throughput reports on stderr, 0 to disable (default: 5)')
+    args = parser.parse_args(argv)
+
+    resume = args.progress_file is not None and os.path.exists(args.progress_file)
+    output = _Output(args.format)
+    if args.source == 'user':
+        jobs = [(_export_user, (username,)) for username in args.targets]
+    else:
+        ids = []
+        for path in args.targets:
+            if path == '-':
+                ids.extend(line.strip() for line in sys.stdin if line.strip())
+            else:
+                with io.open(path, encoding='utf-8') as fin:
+                    ids.extend(line.strip() for line in fin if line.strip())
+        jobs = [(_export_batch, (i, ids[n:n + 300])) for i, n in enumerate(range(0, len(ids), 300))]
+
+    out = _open_output(args.output, resume)
+    try:
+        with Progress(args.progress_file, out, args.report_interval) as progress:
+            if args.source == 'ids':
+                finished = set(progress.state['batches'])
+                jobs = [(fn, job_args) for fn, job_args in jobs if job_args[0] not in finished]
+            run = lambda job: job[0](*(job[1] + (args, progress, output)))
+            # On Ctrl-C, the workers are stopped and waited for, so the saved state matches the output
+            results = lichess.api._concurrent_map(run, jobs, args.workers, stop=progress.stopping.set)
+            try:
+                for _ in results:
+                    pass
+            finally:
+                results.close()
+    except KeyboardInterrupt:
+        sys.stderr.write('\nInterrupted{}\n'.format('; run again with the same progress file to resume' if args.progress_file else ''))
+        return 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
@@ -1,14 +1,157 @@
+from datetime import datetime
 from six import StringIO
-import re
+from six.moves import queue
+import calendar
+import contextlib
 import json
+import os
+import re
+import threading
 
 GAME_STREAM_OBJECT = 'game_stream'
 STREAM_OBJECT = 'stream'
+EVENT_STREAM_OBJECT = 'event_stream'
 GAME_OBJECT = 'game'
 PUBLIC_API_OBJECT = 'public_api'
 MOBILE_API_OBJECT = 'mobile_api'
 
 
+class Stream(object):
+    """An iterator over a streamed response, returned by API methods that stream their results.
+
+    The HTTP connection is released as soon as the stream is exhausted or closed.
+    Use it as a context manager (or call :meth:`close`) when you might stop iterating early:
+
+    >>> import itertools
+    >>>
+    >>> with lichess.api.user_games('cyanfish') as games:
+    >>>     first10 = list(itertools.islice(games, 10))
+
+    Abandoned streams are also closed when they are garbage collected.
+    """
+
+    def __init__(self, iterable, resp=None):
+        self._it = iter(iterable)
+        self._resp = resp
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.closed:
+            raise StopIteration
+        try:
+            return next(self._it)
+        except StopIteration:
+            self.close()
+            raise
+        except BaseException:
+            self.close()
+            raise
+
+    next = __next__
+
+    def close(self):
+        """Stops the stream and releases its HTTP connection. Safe to call more than once."""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            close = getattr(self._it, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            if self._resp is not None:
+                self._resp.close()
+                self._resp = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class PipelinedResponse(object):
+    """Wraps a streamed :class:`requests.Response`, reading it on a background thread while the consumer parses what was already read.
+
+    At most :data:`queue_size` chunks of :data:`chunk_size` bytes are buffered; when the queue is full, the reader waits for the consumer.
+    Errors from the reader are raised in the consumer when it reaches them. Other attributes are delegated to the wrapped response.
+    """
+
+    _END = object()
+
+    def __init__(self, resp, queue_size=16, chunk_size=1 << 16):
+        self._resp = resp
+        self._queue = queue.Queue(queue_size)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._read, args=(chunk_size,))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __getattr__(self, name):
+        return getattr(self._resp, name)
+
+    def _put(self, item):
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _read(self, chunk_size):
+        try:
+            for chunk in self._resp.iter_content(chunk_size):
+                if not self._put(chunk):
+                    return
+        except Exception as e:
+            self._put(e)
+        else:
+            self._put(self._END)
+
+    def iter_content(self, chunk_size=None, decode_unicode=False):
+        """Yields the chunks read by the background thread. The chunk size is set by the reader."""
+        while True:
+            item = self._queue.get()
+            if item is self._END:
+                self._put(self._END)
+                return
+            if isinstance(item, Exception):
+                self._put(item)
+                raise item
+            yield item
+
+    def iter_lines(self, chunk_size=None, decode_unicode=False, delimiter=None):
+        """Yields the lines of the chunks read by the background thread."""
+        pending = b''
+        for chunk in self.iter_content():
+            lines = (pending + chunk).split(delimiter or b'\n')
+            pending = lines.pop()
+            for line in lines:
+                yield line[:-1] if delimiter is None and line.endswith(b'\r') else line
+        if pending:
+            yield pending
+
+    def close(self):
+        """Stops the reader and closes the response."""
+        self._stopped.set()
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        self._resp.close()
+
+
 def stream_pgns(resp):
     buffer = []
     for line in resp.iter_lines():
@@ -44,7 +187,7 @@ class _Pgn(_FormatBase):
 
     def parse(self, object_type, resp):
         if object_type == GAME_STREAM_OBJECT:
-            return stream_pgns(resp)
+            return Stream(stream_pgns(resp), resp)
         return resp.text
 
 
@@ -87,14 +230,17 @@ class _PyChess(_FormatBase):
         if object_type not in (GAME_STREAM_OBJECT, GAME_OBJECT):
             raise ValueError('PyChess format is only valid for games')
         return 'application/x-chess-pgn'
-    
+
+    def stream(self, object_type):
+        return object_type == GAME_STREAM_OBJECT
+
     def parse(self, object_type, resp):
         try:
             import chess.pgn
         except ImportError:
             raise ImportError('PyChess format requires the python-chess package to be installed')
         if object_type == GAME_STREAM_OBJECT:
-            return (chess.pgn.read_game(StringIO(pgn)) for pgn in stream_pgns(resp))
+            return Stream((chess.pgn.read_game(StringIO(pgn)) for pgn in stream_pgns(resp)), resp)
         return chess.pgn.read_game(StringIO(resp.text))
 
 
@@ -119,18 +265,21 @@ P . . P . . . P
 class _Json(_FormatBase):
 
     def content_type(self, object_type):
-        if object_type in (STREAM_OBJECT, GAME_STREAM_OBJECT):
+        if object_type in (STREAM_OBJECT, GAME_STREAM_OBJECT, EVENT_STREAM_OBJECT):
             return 'application/x-ndjson'
         if object_type == MOBILE_API_OBJECT:
             return 'application/vnd.lichess.v3+json'
         return 'application/json'
     
     def stream(self, object_type):
-        return object_type in (STREAM_OBJECT, GAME_STREAM_OBJECT)
+        return object_type in (STREAM_OBJECT, GAME_STREAM_OBJECT, EVENT_STREAM_OBJECT)
 
     def parse(self, object_type, resp):
+        if object_type == EVENT_STREAM_OBJECT:
+            # Read chunks as they arrive rather than waiting for a full buffer, and skip the empty keep-alive lines
+            return Stream((json.loads(s) for s in resp.iter_lines(chunk_size=None) if s), resp)
         if object_type in (STREAM_OBJECT, GAME_STREAM_OBJECT):
-            return (json.loads(s) for s in resp.iter_lines())
+            return Stream((json.loads(s) for s in resp.iter_lines()), resp)
         return json.loads(resp.text)
 
 
@@ -145,6 +294,259 @@ cyanfish
 """
 
 
+class _Compact(_Json):
+
+    def content_type(self, object_type):
+        if object_type not in (GAME_STREAM_OBJECT, GAME_OBJECT):
+            raise ValueError('Compact format is only valid for games')
+        return _Json.content_type(self, object_type)
+
+    def parse(self, object_type, resp):
+        from lichess.records import GameRecord
+        if object_type == GAME_STREAM_OBJECT:
+            return Stream((GameRecord(json.loads(s)) for s in resp.iter_lines()), resp)
+        return GameRecord(json.loads(resp.text))
+
+
+COMPACT = _Compact()
+"""Produces a compact :class:`~lichess.records.GameRecord`, or a generator for multiple records. Use it to keep many games in memory.
+
+>>> from lichess.format import COMPACT
+>>>
+>>> games = list(lichess.api.user_games('cyanfish', format=COMPACT))
+>>> print(games[0].white.user_id, games[0].white.rating)
+cyanfish 1948
+>>> print(games[0].to_pgn())
+[Event "Rated blitz game"]
+...
+"""
+
+
+_GAME_SEPARATORS = {'pgn': b'\n[Event ', 'ndjson': b'\n'}
+_COMPRESSIONS = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz'}
+
+
+def _compressor(fileobj, compression):
+    if compression == 'gzip':
+        import gzip
+        return gzip.GzipFile(fileobj=fileobj, mode='wb')
+    if compression == 'bz2':
+        import bz2
+        return bz2.BZ2File(fileobj, mode='wb')
+    if compression == 'xz':
+        import lzma
+        return lzma.LZMAFile(fileobj, mode='wb')
+    raise ValueError('Unknown compression: {}'.format(compression))
+
+
+def _pgn_id(game):
+    site = re.search(br'\[Site "[^"]*/(\w+)"\]', game)
+    return site.group(1) if site else None
+
+def _pgn_time(game):
+    """Returns the start of a PGN game in ms, to the second, or None."""
+    date = re.search(br'\[UTCDate "([0-9.]+)"\]', game)
+    clock = re.search(br'\[UTCTime "([0-9:]+)"\]', game)
+    if date is None or clock is None:
+        return None
+    played = datetime.strptime((date.group(1) + b' ' + clock.group(1)).decode('ascii'), '%Y.%m.%d %H:%M:%S')
+    return int(calendar.timegm(played.timetuple())) * 1000
+
+def _drop_games(chunks, ids):
+    """Drops the leading games of a PGN byte stream whose ids are in :data:`ids`, then passes the rest through."""
+    data = b''
+    for chunk in chunks:
+        if ids is None:
+            yield chunk
+            continue
+        data += chunk
+        while ids is not None:
+            end = data.find(b'\n[Event ', 1)
+            if end < 0:
+                break
+            if _pgn_id(data[:end + 1]) in ids:
+                data = data[end + 1:]
+            else:
+                ids = None
+        if ids is None:
+            yield data
+            data = b''
+    if data and (ids is None or _pgn_id(data) not in ids):
+        yield data
+
+
+class _GameCounter(object):
+    """Counts the games in a byte stream by their separators, including separators split across chunks."""
+
+    def __init__(self, content):
+        self.separator = _GAME_SEPARATORS[content]
+        # A PGN game at the very start has no newline before it
+        self.tail = b'\n' if len(self.separator) > 1 else b''
+        self.games = 0
+
+    def feed(self, chunk):
+        data = self.tail + chunk
+        self.games += data.count(self.separator)
+        self.tail = data[-(len(self.separator) - 1):] if len(self.separator) > 1 else b''
+
+
+class Raw(_FormatBase):
+    """Writes the response bytes of a game endpoint straight to a file, without decoding them.
+
+    :target: A file path, or a binary file-like object.
+    :content: ``'pgn'`` or ``'ndjson'``.
+    :compression: ``'gzip'``, ``'bz2'``, ``'xz'`` or None. By default, it's inferred from the extension of a path.
+    :chunk_size: The number of bytes read from the response at a time.
+    :resume: Whether to append to an existing (uncompressed) file instead of overwriting it. A partially written last game is removed first.
+        Only supported for :data:`~lichess.api.user_games`, with :meth:`resume_until`.
+
+    The API call returns a dict with the number of ``bytes`` and ``games`` written, and the number of ``resumedGames`` already in the file.
+
+    >>> from lichess.format import Raw
+    >>>
+    >>> result = lichess.api.user_games('cyanfish', format=Raw('cyanfish.pgn.gz'))
+    >>> print(result['games'])
+    1234
+
+    To continue an interrupted export, pass :meth:`resume_until` as the ``until`` parameter:
+
+    >>> raw = Raw('cyanfish.ndjson', content='ndjson', resume=True)
+    >>> result = lichess.api.user_games('cyanfish', until=raw.resume_until(), format=raw)
+    """
+
+    def __init__(self, target, content='pgn', compression=None, chunk_size=1 << 20, resume=False):
+        if content not in _GAME_SEPARATORS:
+            raise ValueError('Raw content must be pgn or ndjson')
+        if compression is None and isinstance(target, str):
+            compression = _COMPRESSIONS.get(os.path.splitext(target)[1])
+        if resume and (compression is not None or not isinstance(target, str)):
+            raise ValueError('Resuming is only supported for uncompressed file paths')
+        self.target = target
+        self.content = content
+        self.compression = compression
+        self.chunk_size = chunk_size
+        self.resume = resume
+        self._resumed_games = None
+        self._skip_ids = None
+
+    def content_type(self, object_type):
+        if object_type not in (GAME_STREAM_OBJECT, GAME_OBJECT):
+            raise ValueError('Raw format is only valid for games')
+        return 'application/x-chess-pgn' if self.content == 'pgn' else 'application/x-ndjson'
+
+    def stream(self, object_type):
+        return True
+
+    def _prepare(self):
+        """Truncates a partially written last game and counts the complete games in the file to resume."""
+        if self._resumed_games is not None:
+            return
+        self._resumed_games = 0
+        if not self.resume or not os.path.exists(self.target):
+            return
+        end = b'\n' if self.content == 'ndjson' else b'\n\n\n'
+        counter = _GameCounter(self.content)
+        complete = 0
+        with open(self.target, 'r+b') as f:
+            offset = 0
+            tail = b''
+            while True:
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    break
+                data = tail + chunk
+                pos = data.rfind(end)
+                if pos >= 0:
+                    complete = offset - len(tail) + pos + len(end)
+                tail = data[-(len(end) - 1):] if len(end) > 1 else b''
+                offset += len(chunk)
+            f.seek(0)
+            remaining = complete
+            while remaining > 0:
+                chunk = f.read(min(self.chunk_size, remaining))
+                counter.feed(chunk)
+                remaining -= len(chunk)
+            f.truncate(complete)
+        self._resumed_games = counter.games
+
+    def _last_games(self):
+        """Returns the last complete games in the file, oldest first (only the last one for ndjson)."""
+        with open(self.target, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(f.tell() - (1 << 16), 0))
+            data = f.read()
+        if self.content == 'ndjson':
+            lines = data.rstrip(b'\n').rsplit(b'\n', 1)
+            return [lines[-1]] if lines[-1] else []
+        # Anything before the first [Event tag may be a truncated game
+        return [b'[Event ' + g for g in data.split(b'[Event ')[1:]]
+
+    def resume_until(self):
+        """Returns the ``until`` timestamp (in ms) to continue a user's export that was interrupted, or None for a new file.
+
+        Games are exported newest first, so this is just before the last complete game in the file.
+        PGN only has the time to the second, so for PGN this is the end of that second, and the games of that second already in the file are dropped from the response.
+        """
+        self._prepare()
+        self._skip_ids = None
+        if not self._resumed_games:
+            return None
+        games = self._last_games()
+        if not games:
+            return None
+        if self.content == 'ndjson':
+            return json.loads(games[-1].decode('utf-8'))['createdAt'] - 1
+        played = _pgn_time(games[-1])
+        if played is None:
+            return None
+        self._skip_ids = set(_pgn_id(g) for g in games if _pgn_time(g) == played)
+        return played + 999
+
+    def _open(self):
+        if isinstance(self.target, str):
+            fout = open(self.target, 'ab' if self.resume else 'wb')
+        else:
+            fout = self.target
+        sink = _compressor(fout, self.compression) if self.compression else fout
+        return fout, sink
+
+    def _close(self, fout, sink):
+        if sink is not fout:
+            sink.close()
+        if fout is not self.target:
+            fout.close()
+
+    @contextlib.contextmanager
+    def _shared(self):
+        """Opens the target once and yields ``(raw, resumed_games)``, where ``raw`` writes responses to the open target without closing it."""
+        self._prepare()
+        resumed, self._resumed_games = self._resumed_games, None
+        fout, sink = self._open()
+        try:
+            yield Raw(sink, self.content, chunk_size=self.chunk_size), resumed
+        finally:
+            self._close(fout, sink)
+
+    def parse(self, object_type, resp):
+        self._prepare()
+        counter = _GameCounter(self.content)
+        written = 0
+        fout, sink = self._open()
+        chunks = resp.iter_content(self.chunk_size)
+        if self._skip_ids:
+            chunks, self._skip_ids = _drop_games(chunks, self._skip_ids), None
+        try:
+            for chunk in chunks:
+                sink.write(chunk)
+                counter.feed(chunk)
+                written += len(chunk)
+        finally:
+            resp.close()
+            self._close(fout, sink)
+        resumed, self._resumed_games = self._resumed_games, None
+        return {'bytes': written, 'games': counter.games, 'resumedGames': resumed}
+
+
 class _Cookies(_FormatBase):
 
     def content_type(self, object_type):
@@ -17,7 +17,7 @@ def _cap(s):
 def from_game(game, headers=None):
     """Converts a JSON game to a PGN string.
 
-    :game: The game object.
+    :game: The game object, or a :class:`~lichess.records.GameRecord`.
     :headers: An optional dictionary with custom PGN headers.
 
     >>> game = lichess.api.game('Qa7FJNk2', with_moves=1)
@@ -30,6 +30,8 @@ def from_game(game, headers=None):
         headers = {}
     else:
         headers = dict(headers)
+    if hasattr(game, 'to_dict'):
+        game = game.to_dict()
     g = game
     if 'moves' not in g:
         raise ValueError('The provided game doesn\'t have any moves. Maybe you forgot to set with_moves=1 on the API call?')
@@ -40,8 +42,8 @@ def from_game(game, headers=None):
     h.append(('Site', 'https://lichess.org/%s' % g['id']))
     h.append(('Date', datetime.fromtimestamp(int(g['createdAt']) / 1000.0).strftime('%Y.%m.%d')))
     h.append(('Round', '?'))
-    h.append(('White', _node(g, 'players.white.userId') or '?'))
-    h.append(('Black', _node(g, 'players.black.userId') or '?'))
+    h.append(('White', _node(g, 'players.white.userId') or _node(g, 'players.white.user.name') or '?'))
+    h.append(('Black', _node(g, 'players.black.userId') or _node(g, 'players.black.user.name') or '?'))
     h.append(('Result', result))
     h.append(('WhiteElo', _node(g, 'players.white.rating') or '?'))
     h.append(('BlackElo', _node(g, 'players.black.rating') or '?'))
@@ -0,0 +1,190 @@
+import io
+import os
+from array import array
+
+_STANDARD_VARIANTS = ('standard', 'chess960', 'fromPosition')
+_replace = getattr(os, 'replace', os.rename)
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError('Position indexes require the numpy package to be installed')
+    return numpy
+
+def _chess():
+    try:
+        import chess.pgn
+        import chess.polyglot
+    except ImportError:
+        raise ImportError('Position indexes require the python-chess package to be installed')
+    return chess
+
+def _empty(np):
+    return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.uint32), np.zeros(0, dtype=np.uint16)
+
+def _merge(np, sorted_arrays, new_arrays):
+    """Merges ``(hashes, games, plies)`` arrays into sorted ones, keeping existing positions before new ones with the same hash."""
+    order = np.argsort(new_arrays[0], kind='stable')
+    new_arrays = [arr[order] for arr in new_arrays]
+    positions = np.searchsorted(sorted_arrays[0], new_arrays[0], side='right')
+    return tuple(np.insert(old, positions, new) for old, new in zip(sorted_arrays, new_arrays))
+
+def _replay(game):
+    """Returns ``(game_id, boards)`` for a JSON game or python-chess game, or None if it can't be replayed."""
+    chess = _chess()
+    if isinstance(game, chess.pgn.Game):
+        game_id = game.headers.get('Site', '').rstrip('/').split('/')[-1]
+        board = game.board()
+        moves = game.mainline_moves()
+        push = board.push
+    else:
+        if 'moves' not in game or game.get('variant', 'standard') not in _STANDARD_VARIANTS:
+            return None
+        game_id = game['id']
+        fen = game.get('initialFen', chess.STARTING_FEN)
+        board = chess.Board(fen, chess960=game.get('variant') == 'chess960')
+        moves = game['moves'].split()
+        push = board.push_san
+    if not game_id:
+        return None
+
+    def boards():
+        yield board
+        for m in moves:
+            push(m)
+            yield board
+    return game_id, boards()
+
+
+class PositionIndex(object):
+    """An index from positions to the games (and plies) that reached them.
+
+    Each position is stored as a 64-bit `Zobrist hash <https://en.wikipedia.org/wiki/Zobrist_hashing>`_ in a sorted array, so lookups are a binary search.
+    Games are replayed once when added; the index can be saved to a directory and loaded back with memory mapping.
+    Requires the `numpy <https://numpy.org>`_ and `python-chess <https://github.com/niklasf/python-chess>`_ packages.
+
+    >>> index = lichess.positions.PositionIndex()
+    >>> index.add_games(lichess.api.user_games('cyanfish'))
+    >>> index.save('cyanfish-index')
+    >>> index = lichess.positions.PositionIndex.load('cyanfish-index')
+    >>> print(index.games_reaching('r1bqkbnr/pppp1ppp/2n5/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 3 3'))
+    ['Qa7FJNk2', ...]
+    """
+
+    def __init__(self):
+        np = _numpy()
+        self.game_ids = []
+        """The ids of the indexed games, in the order they were added."""
+        self._game_numbers = {}
+        # The saved (possibly memory-mapped) positions, a sorted in-memory delta of positions added since, and the unsorted positions not yet looked up
+        self._base = _empty(np)
+        self._delta = _empty(np)
+        self._pending = (array('Q'), array('I'), array('H'))
+
+    def __len__(self):
+        """Returns the number of indexed positions."""
+        return len(self._base[0]) + len(self._delta[0]) + len(self._pending[0])
+
+    def add_games(self, games):
+        """Replays an enumerable of games and adds their positions to the index.
+
+        Games can be JSON games (with moves) or python-chess game objects (e.g. from the :data:`~lichess.format.PYCHESS` format).
+        Games that are already indexed, have illegal moves, or are in a variant other than standard or Chess960, are skipped.
+        Returns the number of games added.
+        """
+        zobrist_hash = _chess().polyglot.zobrist_hash
+        hashes, game_numbers, plies = self._pending
+        added = 0
+        for game in games:
+            replay = _replay(game)
+            if replay is None or replay[0] in self._game_numbers:
+                continue
+            game_id, boards = replay
+            try:
+                game_hashes = [zobrist_hash(board) for board in boards]
+            except ValueError:
+                # Illegal or unparsable moves; the game is skipped rather than partly indexed
+                continue
+            number = len(self.game_ids)
+            self.game_ids.append(game_id)
+            self._game_numbers[game_id] = number
+            hashes.extend(game_hashes)
+            game_numbers.extend([number] * len(game_hashes))
+            plies.extend(min(ply, 0xFFFF) for ply in range(len(game_hashes)))
+            added += 1
+        return added
+
+    def _flush(self):
+        """Sorts the pending positions and merges them into the delta, leaving the base untouched."""
+        np = _numpy()
+        if len(self._pending[0]) == 0:
+            return
+        pending = (np.frombuffer(self._pending[0], dtype=np.uint64),
+                   np.frombuffer(self._pending[1], dtype=np.uint32),
+                   np.frombuffer(self._pending[2], dtype=np.uint16))
+        self._delta = _merge(np, self._delta, pending)
+        self._pending = (array('Q'), array('I'), array('H'))
+
+    def lookup(self, position):
+        """Returns a list of ``(game_id, ply)`` tuples for every time a position was reached.
+
+        :position: A FEN string or a python-chess board.
+        """
+        chess = _chess()
+        np = _numpy()
+        if not isinstance(position, chess.Board):
+            position = chess.Board(position)
+        self._flush()
+        key = np.uint64(chess.polyglot.zobrist_hash(position))
+        found = []
+        for hashes, games, plies in (self._base, self._delta):
+            start = np.searchsorted(hashes, key, side='left')
+            end = np.searchsorted(hashes, key, side='right')
+            found.extend((self.game_ids[g], int(p)) for g, p in zip(games[start:end], plies[start:end]))
+        return found
+
+    def games_reaching(self, position):
+        """Returns the ids of the games that reached a position, in the order they were added.
+
+        :position: A FEN string or a python-chess board.
+        """
+        numbers = sorted(set(self._game_numbers[game_id] for game_id, _ in self.lookup(position)))
+        return [self.game_ids[n] for n in numbers]
+
+    def save(self, path):
+        """Saves the index to a directory, which is created if needed."""
+        np = _numpy()
+        self._flush()
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        arrays = _merge(np, self._base, self._delta) if len(self._delta[0]) else self._base
+        # Write to temporary files first, since the current arrays may be memory-mapped from this directory
+        for name, arr in zip(('hashes', 'games', 'plies'), arrays):
+            with open(os.path.join(path, name + '.npy.tmp'), 'wb') as fout:
+                np.save(fout, arr)
+        with io.open(os.path.join(path, 'ids.txt.tmp'), 'w', encoding='utf-8') as fout:
+            for game_id in self.game_ids:
+                fout.write(u'{}\n'.format(game_id))
+        for name in ('hashes.npy', 'games.npy', 'plies.npy', 'ids.txt'):
+            _replace(os.path.join(path, name + '.tmp'), os.path.join(path, name))
+        self._base, self._delta = arrays, _empty(np)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Loads an index saved with :meth:`save`.
+
+        :path: The index directory.
+        :mmap: Whether to memory-map the arrays instead of reading them into memory.
+
+        Games added to a loaded index are kept in memory next to the loaded arrays, which aren't copied; call :meth:`save` to merge and persist them.
+        """
+        np = _numpy()
+        mode = 'r' if mmap else None
+        index = cls()
+        index._base = tuple(np.load(os.path.join(path, name + '.npy'), mmap_mode=mode) for name in ('hashes', 'games', 'plies'))
+        with io.open(os.path.join(path, 'ids.txt'), encoding='utf-8') as fin:
+            index.game_ids = [line.rstrip('\n') for line in fin]
+        index._game_numbers = dict((game_id, n) for n, game_id in enumerate(index.game_ids))
+        return index
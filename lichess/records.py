@@ -0,0 +1,118 @@
+from six.moves import intern
+import lichess.pgn
+
+
+def _intern(s):
+    return None if s is None else intern(str(s))
+
+def _int(n):
+    return None if n is None else int(n)
+
+
+class PlayerRecord(object):
+    """A compact representation of one side of a game. Produced as part of a :class:`~lichess.records.GameRecord`."""
+
+    __slots__ = ('user_id', 'name', 'title', 'rating', 'rating_diff', 'provisional', 'ai_level')
+
+    def __init__(self, player):
+        user = player.get('user')
+        if user is not None:
+            self.user_id = _intern(user.get('id'))
+            self.name = _intern(user.get('name'))
+            self.title = _intern(user.get('title'))
+        else:
+            self.user_id = _intern(player.get('userId'))
+            self.name = _intern(player.get('name', player.get('userId')))
+            self.title = None
+        self.rating = _int(player.get('rating'))
+        self.rating_diff = _int(player.get('ratingDiff'))
+        self.provisional = bool(player.get('provisional', False))
+        self.ai_level = _int(player.get('aiLevel'))
+
+    def to_dict(self):
+        """Converts the player back to a dict in the JSON format."""
+        d = {}
+        if self.user_id is not None:
+            d['user'] = {'id': self.user_id, 'name': self.name}
+            if self.title is not None:
+                d['user']['title'] = self.title
+        if self.rating is not None:
+            d['rating'] = self.rating
+        if self.rating_diff is not None:
+            d['ratingDiff'] = self.rating_diff
+        if self.provisional:
+            d['provisional'] = True
+        if self.ai_level is not None:
+            d['aiLevel'] = self.ai_level
+        return d
+
+
+class GameRecord(object):
+    """A compact, read-only representation of a JSON game, produced by the :data:`~lichess.format.COMPACT` format.
+
+    Records use ``__slots__``, intern repeated strings (usernames, speeds, variants, statuses, openings) and store ratings and timestamps as integers,
+    which takes several times less memory than the equivalent dicts when many games are kept in memory.
+    Only the commonly used fields are kept; evaluations, clocks per move and other extra data are dropped.
+    """
+
+    __slots__ = ('id', 'rated', 'variant', 'speed', 'perf', 'created_at', 'last_move_at', 'status', 'winner', 'moves', 'initial_fen',
+                 'white', 'black', 'opening_eco', 'opening_name', 'opening_ply', 'clock_initial', 'clock_increment', 'clock_total_time')
+
+    def __init__(self, game):
+        self.id = str(game['id'])
+        self.rated = bool(game.get('rated', False))
+        self.variant = _intern(game.get('variant'))
+        self.speed = _intern(game.get('speed'))
+        self.perf = _intern(game.get('perf'))
+        self.created_at = _int(game.get('createdAt'))
+        self.last_move_at = _int(game.get('lastMoveAt'))
+        self.status = _intern(game.get('status'))
+        self.winner = _intern(game.get('winner'))
+        self.moves = game.get('moves')
+        self.initial_fen = game.get('initialFen')
+        players = game.get('players', {})
+        self.white = PlayerRecord(players.get('white', {}))
+        self.black = PlayerRecord(players.get('black', {}))
+        opening = game.get('opening', {})
+        self.opening_eco = _intern(opening.get('eco'))
+        self.opening_name = _intern(opening.get('name'))
+        self.opening_ply = _int(opening.get('ply'))
+        clock = game.get('clock', {})
+        self.clock_initial = _int(clock.get('initial'))
+        self.clock_increment = _int(clock.get('increment'))
+        self.clock_total_time = _int(clock.get('totalTime'))
+
+    def __repr__(self):
+        return '<GameRecord {}>'.format(self.id)
+
+    def to_dict(self):
+        """Converts the record back to a dict in the JSON format (without the dropped fields)."""
+        d = {
+            'id': self.id,
+            'rated': self.rated,
+            'variant': self.variant,
+            'speed': self.speed,
+            'perf': self.perf,
+            'createdAt': self.created_at,
+            'lastMoveAt': self.last_move_at,
+            'status': self.status,
+            'players': {'white': self.white.to_dict(), 'black': self.black.to_dict()},
+        }
+        if self.winner is not None:
+            d['winner'] = self.winner
+        if self.moves is not None:
+            d['moves'] = self.moves
+        if self.initial_fen is not None:
+            d['initialFen'] = self.initial_fen
+        if self.opening_eco is not None:
+            d['opening'] = {'eco': self.opening_eco, 'name': self.opening_name, 'ply': self.opening_ply}
+        if self.clock_initial is not None:
+            d['clock'] = {'initial': self.clock_initial, 'increment': self.clock_increment, 'totalTime': self.clock_total_time}
+        return d
+
+    def to_pgn(self, headers=None):
+        """Converts the record to a PGN string with :data:`~lichess.pgn.from_game`.
+
+        :headers: An optional dictionary with custom PGN headers.
+        """
+        return lichess.pgn.from_game(self.to_dict(), headers)
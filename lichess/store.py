@@ -0,0 +1,132 @@
+import collections
+import copy
+import json
+import sqlite3
+import threading
+import time
+
+_UNFINISHED = ('created', 'started')
+
+
+class MemoryStore(object):
+    """An in-memory key-value store with LRU eviction and optional per-entry expiry.
+
+    Values are copied when stored and returned, so changing a returned object doesn't affect the store.
+
+    :max_size: The maximum number of entries kept before the least recently used ones are evicted.
+    """
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Returns the value for a key, or None if it's missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires < time.time():
+                del self._entries[key]
+                return None
+            # Move to the end to mark as recently used
+            del self._entries[key]
+            self._entries[key] = entry
+        return copy.deepcopy(value)
+
+    def put(self, key, value, ttl=None):
+        """Stores a value, optionally expiring after :data:`ttl` seconds."""
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (value, time.time() + ttl if ttl is not None else None)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+class DiskStore(object):
+    """A persistent key-value store for JSON objects, backed by an SQLite database.
+
+    :path: The path of the database file, which is created if needed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS objects (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL)')
+
+    def get(self, key):
+        """Returns the value for a key, or None if it's missing or expired."""
+        with self._lock:
+            row = self._db.execute('SELECT value, expires FROM objects WHERE key = ?', (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return None
+        return json.loads(row[0])
+
+    def put(self, key, value, ttl=None):
+        """Stores a value, optionally expiring after :data:`ttl` seconds."""
+        expires = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            with self._db:
+                self._db.execute('INSERT OR REPLACE INTO objects (key, value, expires) VALUES (?, ?, ?)', (key, json.dumps(value), expires))
+
+    def close(self):
+        """Closes the database."""
+        self._db.close()
+
+
+class ObjectStore(object):
+    """A store of games and users keyed by id, consulted by :data:`~lichess.api.games_by_ids` and :data:`~lichess.api.users_by_ids` before making requests.
+
+    Finished games never change, so they are kept until evicted. Unfinished games aren't stored. User profiles expire after :data:`user_ttl` seconds.
+
+    :max_size: The maximum number of objects kept in memory.
+    :path: An optional SQLite database path for a persistent second level.
+    :user_ttl: The number of seconds user profiles are kept.
+
+    >>> lichess.api.default_store = lichess.store.ObjectStore(path='lichess.db')
+    >>> games = list(lichess.api.games_by_ids(['Qa7FJNk2', '4M973EVR']))
+    >>> games = list(lichess.api.games_by_ids(['Qa7FJNk2', '4M973EVR', '9PzeRgcM'])) # Only fetches 9PzeRgcM
+    """
+
+    def __init__(self, max_size=10000, path=None, user_ttl=600):
+        self.memory = MemoryStore(max_size)
+        self.disk = DiskStore(path) if path is not None else None
+        self.user_ttl = user_ttl
+
+    def _get(self, key, ttl=None):
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.put(key, value, ttl)
+        return value
+
+    def _put(self, key, value, ttl=None):
+        self.memory.put(key, value, ttl)
+        if self.disk is not None:
+            self.disk.put(key, value, ttl)
+
+    def get_game(self, game_id):
+        """Returns a stored game, or None."""
+        return self._get('game:' + game_id)
+
+    def put_game(self, game):
+        """Stores a game if it's finished."""
+        if game.get('status') not in _UNFINISHED:
+            self._put('game:' + game['id'], game)
+
+    def get_user(self, user_id):
+        """Returns a stored user, or None. User ids are case-insensitive."""
+        return self._get('user:' + user_id.lower(), self.user_ttl)
+
+    def put_user(self, user):
+        """Stores a user for :data:`user_ttl` seconds."""
+        self._put('user:' + user['id'].lower(), user, self.user_ttl)
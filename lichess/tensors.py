@@ -0,0 +1,210 @@
+import io
+import json
+import os
+
+PIECE_PLANES = ['P', 'N', 'B', 'R', 'Q', 'K', 'p', 'n', 'b', 'r', 'q', 'k']
+"""The piece of each of the 12 planes, in order. Squares are numbered from a1 (0) to h8 (63)."""
+
+META_COLUMNS = ['turn', 'white_kingside', 'white_queenside', 'black_kingside', 'black_queenside', 'ep_file']
+"""The columns of the ``meta`` array: the side to move (1 for white, 0 for black), castling rights (1 or 0), and the en passant file (0-7, or -1)."""
+
+_ARRAYS = {
+    'planes': ('uint8', (12, 64)),
+    'meta': ('int8', (len(META_COLUMNS),)),
+    'moves': ('uint16', ()),
+    'outcomes': ('int8', ()),
+    'games': ('int64', ()),
+}
+_RESULTS = {'1-0': 1, '0-1': -1, '1/2-1/2': 0}
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError('Board tensors require the numpy package to be installed')
+    return numpy
+
+def _chess():
+    try:
+        import chess.pgn
+    except ImportError:
+        raise ImportError('Board tensors require the python-chess package to be installed')
+    return chess
+
+def _size(shape):
+    size = 1
+    for n in shape:
+        size *= n
+    return size
+
+def _json_outcome(game):
+    if game.get('winner') == 'white':
+        return 1
+    if game.get('winner') == 'black':
+        return -1
+    if game.get('status') in ('draw', 'stalemate', 'outoftime', 'insufficientMaterialClaim'):
+        return 0
+    return None
+
+def _replay(game):
+    """Replays a JSON game, PGN string or python-chess game once, capturing each position before a move.
+
+    Returns ``(outcome, bitboards, meta, moves)``, or None if the game can't be used.
+    """
+    chess = _chess()
+    if isinstance(game, str):
+        game = chess.pgn.read_game(io.StringIO(game))
+        if game is None:
+            return None
+    if isinstance(game, chess.pgn.Game):
+        outcome = _RESULTS.get(game.headers.get('Result'))
+        board = game.board()
+        moves = game.mainline_moves()
+        parse = None
+    else:
+        if 'moves' not in game or game.get('variant', 'standard') not in ('standard', 'chess960', 'fromPosition'):
+            return None
+        outcome = _json_outcome(game)
+        board = chess.Board(game.get('initialFen', chess.STARTING_FEN), chess960=game.get('variant') == 'chess960')
+        moves = game['moves'].split()
+        parse = board.parse_san
+    if outcome is None:
+        return None
+    bitboards, meta, codes = [], [], []
+    for move in moves:
+        if parse is not None:
+            move = parse(move)
+        white, black = board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK]
+        bitboards.append((
+            board.pawns & white, board.knights & white, board.bishops & white, board.rooks & white, board.queens & white, board.kings & white,
+            board.pawns & black, board.knights & black, board.bishops & black, board.rooks & black, board.queens & black, board.kings & black,
+        ))
+        meta.append((
+            int(board.turn),
+            int(board.has_kingside_castling_rights(chess.WHITE)), int(board.has_queenside_castling_rights(chess.WHITE)),
+            int(board.has_kingside_castling_rights(chess.BLACK)), int(board.has_queenside_castling_rights(chess.BLACK)),
+            -1 if board.ep_square is None else chess.square_file(board.ep_square),
+        ))
+        codes.append(move.from_square | move.to_square << 6 | (move.promotion or 0) << 12)
+        board.push(move)
+    return outcome, bitboards, meta, codes
+
+
+class BoardTensorWriter(object):
+    """Replays games into fixed-shape arrays for machine learning, saved as files that can be memory-mapped with :func:`~lichess.tensors.load`.
+
+    Each position before a move becomes one row:
+
+    - ``planes``: ``uint8[12, 64]`` piece planes (see :data:`~lichess.tensors.PIECE_PLANES`)
+    - ``meta``: ``int8[6]`` side to move, castling rights and en passant file (see :data:`~lichess.tensors.META_COLUMNS`)
+    - ``moves``: ``uint16`` move played, encoded as ``from | to << 6 | promotion << 12`` (promotion is a python-chess piece type, or 0)
+    - ``outcomes``: ``int8`` game result from white's point of view (1, 0 or -1)
+
+    ``games`` holds the index of each game's first row. Games without a result, or in variants other than standard and Chess960, are skipped.
+    Writing to an existing directory appends to it.
+    Requires the `numpy <https://numpy.org>`_ and `python-chess <https://github.com/niklasf/python-chess>`_ packages.
+
+    :path: The output directory, which is created if needed.
+    :batch_size: The number of games whose positions are converted and written at a time.
+
+    >>> with lichess.tensors.BoardTensorWriter('cyanfish-tensors') as writer:
+    >>>     writer.write(lichess.api.user_games('cyanfish'))
+    >>> data = lichess.tensors.load('cyanfish-tensors')
+    >>> print(data['planes'].shape)
+    (61234, 12, 64)
+    """
+
+    def __init__(self, path, batch_size=256):
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        self.path = path
+        self.batch_size = batch_size
+        self.positions = 0
+        self.game_count = 0
+        meta_path = os.path.join(path, 'meta.json')
+        if os.path.exists(meta_path):
+            with io.open(meta_path, encoding='utf-8') as fin:
+                meta = json.load(fin)
+            self.positions = meta['positions']
+            self.game_count = meta['games']
+        self._files = {}
+        for name, (dtype, shape) in _ARRAYS.items():
+            f = open(os.path.join(path, name + '.bin'), 'ab')
+            # Drop anything written after the last close, e.g. by an interrupted writer
+            rows = self.game_count if name == 'games' else self.positions
+            f.truncate(rows * _numpy().dtype(dtype).itemsize * _size(shape))
+            self._files[name] = f
+        self._batch = []
+
+    def write(self, games):
+        """Replays an enumerable of games (JSON games with moves, PGN strings, or python-chess games) and writes their positions.
+
+        Returns the number of positions written.
+        """
+        before = self.positions
+        for game in games:
+            replay = _replay(game)
+            if replay is None or not replay[3]:
+                continue
+            self._batch.append(replay)
+            if len(self._batch) >= self.batch_size:
+                self._flush()
+        self._flush()
+        return self.positions - before
+
+    def _flush(self):
+        if not self._batch:
+            return
+        np = _numpy()
+        bitboards, meta, moves, outcomes, starts = [], [], [], [], []
+        for outcome, game_bitboards, game_meta, game_moves in self._batch:
+            starts.append(self.positions + len(moves))
+            bitboards.extend(game_bitboards)
+            meta.extend(game_meta)
+            moves.extend(game_moves)
+            outcomes.extend([outcome] * len(game_moves))
+        self._batch = []
+
+        # Expand the bitboards into planes in one vectorized step: bit n of each little-endian uint64 is square n
+        bitboards = np.array(bitboards, dtype='<u8')
+        planes = np.unpackbits(bitboards.view(np.uint8).reshape(len(bitboards), 12, 8), axis=-1, bitorder='little')
+        planes.tofile(self._files['planes'])
+        np.array(meta, dtype=np.int8).tofile(self._files['meta'])
+        np.array(moves, dtype=np.uint16).tofile(self._files['moves'])
+        np.array(outcomes, dtype=np.int8).tofile(self._files['outcomes'])
+        np.array(starts, dtype=np.int64).tofile(self._files['games'])
+        self.positions += len(moves)
+        self.game_count += len(starts)
+
+    def close(self):
+        """Writes any pending positions and the metadata needed by :func:`~lichess.tensors.load`."""
+        self._flush()
+        for f in self._files.values():
+            f.close()
+        with io.open(os.path.join(self.path, 'meta.json'), 'w', encoding='utf-8') as fout:
+            fout.write(json.dumps({'positions': self.positions, 'games': self.game_count}))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def load(path):
+    """Memory-maps the arrays written by a :class:`~lichess.tensors.BoardTensorWriter`, without copying them.
+
+    Returns a dict with ``planes``, ``meta``, ``moves``, ``outcomes`` and ``games`` arrays.
+    """
+    np = _numpy()
+    with io.open(os.path.join(path, 'meta.json'), encoding='utf-8') as fin:
+        meta = json.load(fin)
+    arrays = {}
+    for name, (dtype, shape) in _ARRAYS.items():
+        rows = meta['games'] if name == 'games' else meta['positions']
+        if rows == 0:
+            arrays[name] = np.zeros((0,) + shape, dtype=dtype)
+        else:
+            arrays[name] = np.memmap(os.path.join(path, name + '.bin'), dtype=dtype, mode='r', shape=(rows,) + shape)
+    return arrays
@@ -18,6 +18,9 @@ setuptools.setup(
     url="https://github.com/cyanfish/python-lichess",
     packages=["lichess"],
     install_requires=['requests', 'six'],
+    entry_points={
+        'console_scripts': ['lichess-export = lichess.export:main'],
+    },
     python_requires=">=2.7,!=3.0.*,!=3.1.*,!=3.2.*",
     classifiers=[
         "Development Status :: 4 - Beta",
@@ -1,9 +1,50 @@
 import lichess.api
 import lichess.pgn
 import lichess.format
+import lichess.analytics
+import lichess.positions
+import lichess.records
+import lichess.store
+import lichess.export
+import lichess.tensors
+import chess
 import chess.pgn
+import gzip
 import itertools
+import json
+import numpy
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
 import unittest
+from six.moves import BaseHTTPServer
+
+def sample_game(game_id, white, black, winner=None, speed='blitz', created_at=0, eco='C50', moves='e4 e5 Nf3 Nc6 Bc4 Bc5'):
+    game = {
+        'id': game_id,
+        'rated': True,
+        'variant': 'standard',
+        'speed': speed,
+        'perf': speed,
+        'createdAt': created_at,
+        'lastMoveAt': created_at + 60000,
+        'status': 'mate' if winner else 'draw',
+        'players': {
+            'white': {'user': {'name': white, 'id': white.lower()}, 'rating': 1500 + created_at % 100},
+            'black': {'user': {'name': black, 'id': black.lower()}, 'rating': 1600},
+        },
+        'opening': {'eco': eco, 'name': 'Italian Game', 'ply': 6},
+        'moves': moves,
+        'clock': {'initial': 300, 'increment': 3, 'totalTime': 420},
+    }
+    if winner:
+        game['winner'] = winner
+    return game
 
 class ApiIntegrationTestCase(unittest.TestCase):
 
@@ -126,5 +167,805 @@ class PgnIntegrationTestCase(unittest.TestCase):
         fen = game.end().board().fen()
         self.assertEqual(fen, '2r5/p2Q1ppp/1p2k3/1Bb1P3/5B2/P7/1P3PPP/R3K2R b KQ - 0 21')
 
+class FakeResponse(object):
+    """A stand-in for a streamed :class:`requests.Response`."""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.closed = False
+
+    def iter_lines(self):
+        for line in self.lines:
+            if self.closed:
+                raise ValueError('Read from a closed response')
+            yield line
+
+    def iter_content(self, chunk_size=None):
+        for line in self.iter_lines():
+            yield line + b'\n'
+
+    def close(self):
+        self.closed = True
+
+class StreamTestCase(unittest.TestCase):
+
+    def test_close_releases_connection(self):
+        resp = FakeResponse([b'{"id": 1}', b'{"id": 2}', b'{"id": 3}'])
+        with lichess.format.JSON.parse(lichess.format.STREAM_OBJECT, resp) as objs:
+            self.assertEqual(next(objs), {'id': 1})
+            self.assertFalse(resp.closed)
+        self.assertTrue(resp.closed)
+        self.assertEqual(list(objs), [])
+
+    def test_exhaustion_releases_connection(self):
+        resp = FakeResponse([b'{"id": 1}'])
+        objs = lichess.format.JSON.parse(lichess.format.STREAM_OBJECT, resp)
+        self.assertEqual(list(objs), [{'id': 1}])
+        self.assertTrue(resp.closed)
+
+    def test_batch_close(self):
+        responses = []
+        def page(ids, **kwargs):
+            responses.append(FakeResponse([('{"id": "%s"}' % i).encode('utf-8') for i in ids]))
+            return lichess.format.JSON.parse(lichess.format.GAME_STREAM_OBJECT, responses[-1])
+        with lichess.api._batch(page, [['a', 'b', 'c']], {}, 2) as games:
+            for g in games:
+                break
+        self.assertEqual(len(responses), 1)
+        self.assertTrue(responses[0].closed)
+
+class LocalServer(object):
+    """A local stand-in for the lichess server.
+
+    Routes map a path to a ``(status, chunks, delay)`` tuple, or a list of them to use for consecutive requests.
+    Each chunk is written after sleeping for ``delay`` seconds; a number instead of a chunk adds a pause. With :data:`chunked`, responses use chunked transfer encoding like lichess streams do.
+    """
+
+    def __init__(self, routes, chunked=False):
+        server = self
+
+        class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+            protocol_version = 'HTTP/1.1' if chunked else 'HTTP/1.0'
+
+            def do_GET(self):
+                if 'Content-Length' in self.headers:
+                    self.rfile.read(int(self.headers['Content-Length']))
+                path = self.path.split('?')[0]
+                server.requests.append(path)
+                route = server.routes[path]
+                if isinstance(route, list):
+                    route = route.pop(0) if len(route) > 1 else route[0]
+                status, chunks, delay = route
+                self.send_response(status)
+                if chunked:
+                    self.send_header('Transfer-Encoding', 'chunked')
+                    self.send_header('Connection', 'close')
+                self.end_headers()
+                try:
+                    for chunk in chunks:
+                        time.sleep(delay)
+                        if not isinstance(chunk, bytes):
+                            time.sleep(chunk)
+                            continue
+                        if chunked:
+                            chunk = ('%x\r\n' % len(chunk)).encode('ascii') + chunk + b'\r\n'
+                        self.wfile.write(chunk)
+                        self.wfile.flush()
+                    if chunked:
+                        self.wfile.write(b'0\r\n\r\n')
+                except (IOError, OSError):
+                    pass
+
+            do_POST = do_GET
+
+            def log_message(self, *args):
+                pass
+
+        self.routes = routes
+        self.requests = []
+        self.httpd = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:{}/'.format(self.httpd.server_address[1])
+        self.thread = threading.Thread(target=self.httpd.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def client(self, **kwargs):
+        kwargs.setdefault('scheduler', lichess.api.RequestScheduler())
+        return lichess.api.DefaultApiClient(base_url=self.url, **kwargs)
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+class TimeoutTestCase(unittest.TestCase):
+
+    def setUp(self):
+        lines = [('{"id": "%s", "pad": "%s"}\n' % (i, 'x' * 1000)).encode('utf-8') for i in 'abc']
+        self.server = LocalServer({
+            '/slow': (200, lines, 0.3),
+            '/limited': (429, [], 0),
+            '/stalled': (200, [b'{"id": ', 2], 0),
+        })
+
+    def tearDown(self):
+        self.server.close()
+
+    def test_deadline_while_streaming(self):
+        client = self.server.client()
+        games = client.call('/slow', {}, object_type=lichess.format.GAME_STREAM_OBJECT, deadline=0.8)
+        with self.assertRaises(lichess.api.ApiTimeoutError) as ctx:
+            list(games)
+        self.assertGreaterEqual(ctx.exception.items, 1)
+        self.assertLess(ctx.exception.items, 3)
+
+    def test_idle_timeout(self):
+        client = self.server.client(idle_timeout=0.1)
+        with self.assertRaises(lichess.api.ApiTimeoutError):
+            list(client.call('/slow', {}, object_type=lichess.format.GAME_STREAM_OBJECT))
+
+    def test_raw_deadline(self):
+        path = tempfile.mkdtemp()
+        try:
+            raw = lichess.format.Raw(os.path.join(path, 'games.ndjson'), content='ndjson', chunk_size=256)
+            with self.assertRaises(lichess.api.ApiTimeoutError):
+                self.server.client().call('/slow', {}, format=raw, object_type=lichess.format.GAME_STREAM_OBJECT, deadline=0.5)
+            with self.assertRaises(lichess.api.ApiTimeoutError) as ctx:
+                self.server.client(idle_timeout=0.1).call('/slow', {}, format=raw, object_type=lichess.format.GAME_STREAM_OBJECT)
+            self.assertEqual(ctx.exception.reason, 'Timed out')
+        finally:
+            shutil.rmtree(path)
+
+    def test_read_timeout_mid_body(self):
+        client = self.server.client(read_timeout=0.5)
+        with self.assertRaises(lichess.api.ApiTimeoutError) as ctx:
+            client.call('/stalled', {})
+        self.assertEqual(ctx.exception.reason, 'Timed out')
+
+    def test_deadline_covers_rate_limit(self):
+        client = self.server.client(deadline=5)
+        start = time.time()
+        with self.assertRaises(lichess.api.ApiTimeoutError) as ctx:
+            client.call('/limited', {})
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(ctx.exception.items, 0)
+
+class LiveStreamTestCase(unittest.TestCase):
+
+    def event(self, fen, status='started'):
+        return ('{"fen": "%s", "status": "%s"}\n' % (fen, status)).encode('utf-8')
+
+    def test_reconnect_without_repeats(self):
+        server = LocalServer({'/api/stream/game/abc': [
+            (200, [self.event('a'), b'\n', self.event('b'), 1], 0.05),
+            (200, [self.event('b'), b'\n', b'\n', self.event('c', 'mate')], 0.05),
+        ]}, chunked=True)
+        try:
+            events = lichess.api.game_stream('abc', client=server.client(), idle_timeout=0.3)
+            self.assertEqual([e['fen'] for e in events], ['a', 'b', 'c'])
+            self.assertEqual(len(server.requests), 2)
+        finally:
+            server.close()
+
+    def test_interactive_priority(self):
+        priorities = []
+        class Client(object):
+            def call(self, path, params=None, post_data=None, **kwargs):
+                priorities.append(kwargs.get('priority'))
+                return lichess.format.Stream(iter([{'fen': 'a', 'status': 'mate'}]))
+        self.assertEqual(len(list(lichess.api.game_stream('abc', client=Client()))), 1)
+        self.assertEqual(priorities, [lichess.api.INTERACTIVE])
+
+    def test_reconnect_after_clean_end(self):
+        server = LocalServer({'/api/stream/game/abc': [
+            (200, [self.event('a'), self.event('b')], 0.05),
+            (200, [self.event('b'), self.event('c'), self.event('c', 'resign')], 0.05),
+        ]}, chunked=True)
+        try:
+            events = lichess.api.game_stream('abc', client=server.client(scheduler=lichess.api.RequestScheduler(interval=0.01)))
+            self.assertEqual([(e['fen'], e['status']) for e in events], [('a', 'started'), ('b', 'started'), ('c', 'started'), ('c', 'resign')])
+            self.assertEqual(len(server.requests), 2)
+        finally:
+            server.close()
+
+class ExportTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        games = [sample_game('g%d' % i, 'cyanfish', 'thibault', created_at=1000 - i) for i in range(5)]
+        self.server = LocalServer({'/api/games/user/cyanfish': [
+            (200, [(json.dumps(g) + '\n').encode('utf-8') for g in games[:3]] + [b'{"broken'], 0),
+            (200, [(json.dumps(g) + '\n').encode('utf-8') for g in games[3:]], 0),
+        ]})
+        self.default_client = lichess.api.default_client
+        lichess.api.default_client = self.server.client()
+
+    def tearDown(self):
+        lichess.api.default_client = self.default_client
+        self.server.close()
+        shutil.rmtree(self.dir)
+
+    def test_resume(self):
+        output = os.path.join(self.dir, 'games.ndjson.gz')
+        progress = os.path.join(self.dir, 'progress.json')
+        argv = ['user', 'cyanfish', '-o', output, '-p', progress, '--save-every', '2', '--report-interval', '0']
+        with self.assertRaises(ValueError):
+            lichess.export.main(argv)
+        self.assertEqual(lichess.export.main(argv), 0)
+        with gzip.open(output, 'rt') as fin:
+            ids = [json.loads(line)['id'] for line in fin]
+        self.assertEqual(ids, ['g0', 'g1', 'g2', 'g3', 'g4'])
+        with open(progress) as fin:
+            self.assertEqual(json.load(fin)['users']['cyanfish'], {'games': 5, 'until': 996, 'skip': ['g4'], 'done': True})
+
+    def test_pgn_from_api(self):
+        pgn = ('[Event "Rated blitz game"]\n[Site "https://lichess.org/p0"]\n[UTCDate "2020.09.13"]\n[UTCTime "12:26:43"]\n'
+               '[Result "1/2-1/2"]\n[Termination "Normal"]\n\n1. e4 { [%clk 0:05:00] } e5 { [%clk 0:05:00] } 1/2-1/2\n\n\n')
+        server = LocalServer({'/api/games/user/thibault': (200, [pgn.encode('utf-8')], 0)})
+        output = os.path.join(self.dir, 'games.pgn')
+        progress = os.path.join(self.dir, 'progress.json')
+        lichess.api.default_client = server.client()
+        try:
+            self.assertEqual(lichess.export.main(['user', 'thibault', '-f', 'pgn', '-o', output, '-p', progress, '--report-interval', '0']), 0)
+        finally:
+            server.close()
+        with open(output) as fin:
+            self.assertEqual(fin.read(), pgn)
+        with open(progress) as fin:
+            self.assertEqual(json.load(fin)['users']['thibault'], {'games': 1, 'until': 1600000003999, 'skip': ['p0'], 'done': True})
+
+    def test_interrupted_worker(self):
+        games = [sample_game('g%d' % i, 'cyanfish', 'thibault', created_at=1000 - i) for i in range(20)]
+        main_thread = threading.current_thread().ident
+
+        class InterruptingClient(object):
+            """Serves games created until the requested timestamp, and sends Ctrl-C to the main thread after the 10th one."""
+
+            def __init__(self, interrupt):
+                self.interrupt = interrupt
+
+            def call(self, path, params=None, post_data=None, **kwargs):
+                until = params.get('until', 1000)
+                def stream():
+                    for n, g in enumerate(g for g in games if g['createdAt'] <= until):
+                        if n == 10 and self.interrupt:
+                            time.sleep(0.2)
+                            signal.pthread_kill(main_thread, signal.SIGINT)
+                            time.sleep(0.2)
+                        yield g
+                return lichess.format.Stream(stream())
+
+        output = os.path.join(self.dir, 'games.ndjson')
+        progress = os.path.join(self.dir, 'progress.json')
+        argv = ['user', 'cyanfish', '-o', output, '-p', progress, '--report-interval', '0']
+        lichess.api.default_client = InterruptingClient(True)
+        self.assertEqual(lichess.export.main(argv), 1)
+        with open(progress) as fin:
+            written = json.load(fin)['users']['cyanfish']['games']
+        with open(output) as fin:
+            self.assertEqual(len(fin.readlines()), written)
+        lichess.api.default_client = InterruptingClient(False)
+        self.assertEqual(lichess.export.main(argv), 0)
+        with open(output) as fin:
+            self.assertEqual([json.loads(line)['id'] for line in fin], [g['id'] for g in games])
+
+class MemoryFootprintTestCase(unittest.TestCase):
+    """Checks that streaming formats run in bounded memory, by replaying large synthetic responses and tracing peak allocations."""
+
+    report = []
+
+    @classmethod
+    def tearDownClass(cls):
+        for line in cls.report:
+            sys.stderr.write(line + '\n')
+
+    def serve(self, games, pgn=False):
+        if pgn:
+            body = '\n\n'.join(lichess.pgn.from_game(g) for g in games).encode('utf-8')
+        else:
+            body = b''.join((json.dumps(g) + '\n').encode('utf-8') for g in games)
+        chunks = [body[i:i + 65536] for i in range(0, len(body), 65536)]
+        route = (200, chunks, 0)
+        return LocalServer({'/api/games/user/cyanfish': route, '/games/export/_ids': route, '/api/team/coders/users': route}), len(body)
+
+    def measure(self, name, call, count, pgn=False):
+        games = [sample_game('g%d' % i, 'cyanfish', 'thibault', created_at=i, moves=' '.join(['Nf3 Nf6 Ng1 Ng8'] * 10)) for i in range(count)]
+        server, size = self.serve(games, pgn)
+        try:
+            client = server.client()
+            tracemalloc.start()
+            try:
+                seen = 0
+                for _ in call(client):
+                    seen += 1
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        finally:
+            server.close()
+        self.assertEqual(seen, count)
+        self.report.append('{}: {} games, {} KB response, {} KB peak, {:.0f} bytes peak per game'.format(name, count, size // 1024, peak // 1024, peak / float(count)))
+        return peak, size
+
+    def assert_bounded(self, name, call, count, relative=True):
+        pgn = name.split()[-1] in ('PGN', 'PYCHESS')
+        small, _ = self.measure(name, call, count, pgn)
+        large, size = self.measure(name, call, count * 4, pgn)
+        self.assertLess(large, small * 1.5 + 256 * 1024, '{} peak memory grows with the response size'.format(name))
+        if relative:
+            self.assertLess(large, size / 2, '{} buffers the response'.format(name))
+
+    def test_user_games_json(self):
+        self.assert_bounded('user_games JSON', lambda c: lichess.api.user_games('cyanfish', client=c), 2000)
+
+    def test_user_games_compact(self):
+        self.assert_bounded('user_games COMPACT', lambda c: lichess.api.user_games('cyanfish', client=c, format=lichess.format.COMPACT), 2000)
+
+    def test_user_games_pgn(self):
+        self.assert_bounded('user_games PGN', lambda c: lichess.api.user_games('cyanfish', client=c, format=lichess.format.PGN), 2000)
+
+    def test_user_games_pychess(self):
+        # A python-chess game tree is larger than its PGN, so only check that the peak doesn't grow
+        self.assert_bounded('user_games PYCHESS', lambda c: lichess.api.user_games('cyanfish', client=c, format=lichess.format.PYCHESS), 100, relative=False)
+
+    def test_games_by_ids(self):
+        self.assert_bounded('games_by_ids JSON', lambda c: lichess.api.games_by_ids(['g'], client=c), 2000)
+
+    def test_users_by_team(self):
+        self.assert_bounded('users_by_team JSON', lambda c: lichess.api.users_by_team('coders', client=c), 2000)
+
+    def test_single_pgn(self):
+        # SINGLE_PGN returns one string, so it holds the whole response; check it holds little more than the body and its decoded copy
+        games = [sample_game('g%d' % i, 'cyanfish', 'thibault', created_at=i) for i in range(2000)]
+        server, size = self.serve(games, pgn=True)
+        try:
+            client = server.client()
+            tracemalloc.start()
+            try:
+                pgn = lichess.api.user_games('cyanfish', client=client, format=lichess.format.SINGLE_PGN)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        finally:
+            server.close()
+        self.assertEqual(len(pgn.encode('utf-8')), size)
+        self.report.append('user_games SINGLE_PGN: one string, {} KB response, {} KB peak ({:.1f}x the response)'.format(size // 1024, peak // 1024, peak / float(size)))
+        self.assertLess(peak, size * 3)
+
+    def test_enum(self):
+        page_size = 100
+        def page(**kwargs):
+            results = [sample_game('g%d' % i, 'cyanfish', 'thibault') for i in range(page_size)]
+            return {'currentPage': kwargs['page'], 'nextPage': kwargs['page'] + 1 if kwargs['page'] < 80 else None, 'currentPageResults': results}
+        tracemalloc.start()
+        try:
+            seen = sum(1 for _ in lichess.api._enum(page, [], {}))
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(seen, 80 * page_size)
+        self.report.append('_enum: {} games, {} KB peak, {:.0f} bytes peak per game'.format(seen, peak // 1024, peak / float(seen)))
+        self.assertLess(peak, 1024 * 1024)
+
+class RawExportTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.games = [sample_game('g%d' % i, 'cyanfish', 'thibault', created_at=1000 - i) for i in range(50)]
+        self.pgn = ''.join(lichess.pgn.from_game(g) + '\n\n' for g in self.games).encode('utf-8')
+        self.ndjson = b''.join((json.dumps(g) + '\n').encode('utf-8') for g in self.games)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_compressed_pgn(self):
+        server = LocalServer({'/api/games/user/cyanfish': (200, [self.pgn[i:i + 1000] for i in range(0, len(self.pgn), 1000)], 0)})
+        path = os.path.join(self.dir, 'games.pgn.gz')
+        try:
+            result = lichess.api.user_games('cyanfish', client=server.client(), format=lichess.format.Raw(path, chunk_size=4096))
+        finally:
+            server.close()
+        self.assertEqual(result, {'bytes': len(self.pgn), 'games': 50, 'resumedGames': 0})
+        with gzip.open(path, 'rb') as fin:
+            self.assertEqual(fin.read(), self.pgn)
+
+    def test_bounded_memory(self):
+        body = self.ndjson * 100
+        server = LocalServer({'/api/games/user/cyanfish': (200, [body[i:i + 65536] for i in range(0, len(body), 65536)], 0)})
+        path = os.path.join(self.dir, 'games.ndjson')
+        try:
+            tracemalloc.start()
+            try:
+                result = lichess.api.user_games('cyanfish', client=server.client(), format=lichess.format.Raw(path, content='ndjson', chunk_size=65536))
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        finally:
+            server.close()
+        self.assertEqual(result['games'], 5000)
+        self.assertLess(peak, len(body) / 4)
+
+    def test_resume(self):
+        path = os.path.join(self.dir, 'games.ndjson')
+        lines = self.ndjson.split(b'\n')
+        with open(path, 'wb') as fout:
+            fout.write(b'\n'.join(lines[:20]) + b'\n' + lines[20][:30])
+        raw = lichess.format.Raw(path, content='ndjson', resume=True)
+        self.assertEqual(raw.resume_until(), self.games[19]['createdAt'] - 1)
+        rest = b'\n'.join(lines[20:])
+        server = LocalServer({'/api/games/user/cyanfish': (200, [rest], 0)})
+        try:
+            result = lichess.api.user_games('cyanfish', client=server.client(), format=raw)
+        finally:
+            server.close()
+        self.assertEqual(result, {'bytes': len(rest), 'games': 30, 'resumedGames': 20})
+        with open(path, 'rb') as fin:
+            self.assertEqual(fin.read(), self.ndjson)
+
+    def test_resume_pgn_same_second(self):
+        def pgn(game_id, clock):
+            return ('[Event "Rated blitz game"]\n[Site "https://lichess.org/%s"]\n[UTCDate "2020.09.13"]\n[UTCTime "%s"]\n\n'
+                    '1. e4 e5 1/2-1/2\n\n\n' % (game_id, clock)).encode('utf-8')
+        games = [pgn('g0', '12:26:45'), pgn('g1', '12:26:43'), pgn('g2', '12:26:43'), pgn('g3', '12:26:40')]
+        path = os.path.join(self.dir, 'games.pgn')
+        with open(path, 'wb') as fout:
+            fout.write(games[0] + games[1] + games[2][:40])
+        raw = lichess.format.Raw(path, resume=True)
+        self.assertEqual(raw.resume_until(), 1600000003999)
+        server = LocalServer({'/api/games/user/cyanfish': (200, [games[1][:30], games[1][30:] + games[2], games[3]], 0)})
+        try:
+            result = lichess.api.user_games('cyanfish', client=server.client(), format=raw)
+        finally:
+            server.close()
+        self.assertEqual(result['games'], 2)
+        with open(path, 'rb') as fin:
+            self.assertEqual(fin.read(), b''.join(games))
+
+    def test_games_by_ids_batches(self):
+        games = [sample_game('g%d' % i, 'cyanfish', 'thibault') for i in range(301)]
+        pages = [b''.join((json.dumps(g) + '\n').encode('utf-8') for g in page) for page in (games[:300], games[300:])]
+        server = LocalServer({'/games/export/_ids': [(200, [pages[0]], 0), (200, [pages[1]], 0)]})
+        path = os.path.join(self.dir, 'games.ndjson.gz')
+        try:
+            client = server.client(scheduler=lichess.api.RequestScheduler(interval=0.01))
+            result = lichess.api.games_by_ids([g['id'] for g in games], client=client, format=lichess.format.Raw(path, content='ndjson'))
+        finally:
+            server.close()
+        self.assertEqual(len(server.requests), 2)
+        self.assertEqual(result, {'bytes': len(pages[0]) + len(pages[1]), 'games': 301, 'resumedGames': 0})
+        with gzip.open(path, 'rb') as fin:
+            self.assertEqual(fin.read(), pages[0] + pages[1])
+        with self.assertRaises(ValueError):
+            lichess.api.games_by_ids(['g0'], format=lichess.format.Raw(os.path.join(self.dir, 'games.ndjson'), content='ndjson', resume=True))
+
+class RequestSchedulerTestCase(unittest.TestCase):
+
+    def test_interactive_first(self):
+        scheduler = lichess.api.RequestScheduler(interval=0.1, reserved=0)
+        order = []
+        def request(name, priority):
+            scheduler.acquire(priority)
+            order.append(name)
+        scheduler.acquire(lichess.api.BULK)
+        threads = [threading.Thread(target=request, args=('bulk%d' % i, lichess.api.BULK)) for i in range(3)]
+        for t in threads:
+            t.start()
+        time.sleep(0.05)
+        interactive = threading.Thread(target=request, args=('interactive', lichess.api.INTERACTIVE))
+        interactive.start()
+        for t in threads + [interactive]:
+            t.join()
+        self.assertEqual(order[0], 'interactive')
+        stats = scheduler.stats()
+        self.assertEqual(stats[lichess.api.BULK]['count'], 4)
+        self.assertEqual(stats[lichess.api.INTERACTIVE]['count'], 1)
+        self.assertLess(stats[lichess.api.INTERACTIVE]['maxWait'], stats[lichess.api.BULK]['maxWait'])
+
+    def test_reserved_capacity(self):
+        scheduler = lichess.api.RequestScheduler(interval=0.05, reserved=0.5)
+        scheduler.acquire(lichess.api.BULK)
+        self.assertLess(scheduler.acquire(lichess.api.INTERACTIVE), 0.09)
+        self.assertGreater(scheduler.acquire(lichess.api.BULK), 0.03)
+        self.assertEqual(scheduler.acquire(lichess.api.BULK, end=time.time() + 0.01), None)
+        self.assertEqual(scheduler.stats()[lichess.api.BULK]['waiting'], 0)
+
+    def test_pause(self):
+        scheduler = lichess.api.RequestScheduler(interval=0.01)
+        scheduler.pause_until(time.time() + 0.2)
+        self.assertEqual(scheduler.acquire(lichess.api.INTERACTIVE, end=time.time() + 0.1), None)
+        self.assertGreater(scheduler.acquire(lichess.api.BULK), 0.05)
+
+    def test_reservation_is_work_conserving(self):
+        scheduler = lichess.api.RequestScheduler(interval=0.05, reserved=0.5, linger=0.2)
+        start = time.time()
+        for _ in range(3):
+            scheduler.acquire(lichess.api.BULK)
+        self.assertLess(time.time() - start, 0.15)
+        scheduler.acquire(lichess.api.INTERACTIVE)
+        self.assertGreater(scheduler.acquire(lichess.api.BULK), 0.03)
+        time.sleep(0.2)
+        start = time.time()
+        scheduler.acquire(lichess.api.BULK)
+        scheduler.acquire(lichess.api.BULK)
+        self.assertLess(time.time() - start, 0.08)
+
+class FailingResponse(FakeResponse):
+
+    def iter_content(self, chunk_size=None):
+        for chunk in FakeResponse.iter_content(self, chunk_size):
+            yield chunk
+        raise IOError('Connection lost')
+
+class PipelineTestCase(unittest.TestCase):
+
+    def test_pipelined_stream(self):
+        games = [sample_game('g%d' % i, 'cyanfish', 'thibault') for i in range(500)]
+        body = b''.join((json.dumps(g) + '\n').encode('utf-8') for g in games)
+        server = LocalServer({'/api/games/user/cyanfish': (200, [body[i:i + 5000] for i in range(0, len(body), 5000)], 0)})
+        try:
+            client = server.client()
+            client.pipeline_chunk_size = 4096
+            self.assertEqual(list(lichess.api.user_games('cyanfish', client=client, pipeline=4)), games)
+        finally:
+            server.close()
+
+    def test_parse_error_stops_reader(self):
+        class BrokenFormat(lichess.format._Json):
+            def parse(self, object_type, resp):
+                self.resp = resp
+                raise ImportError('Missing parser')
+        body = b'{"id": "a"}\n' * 100000
+        server = LocalServer({'/api/games/user/cyanfish': (200, [body], 0)})
+        try:
+            broken = BrokenFormat()
+            with self.assertRaises(ImportError):
+                lichess.api.user_games('cyanfish', client=server.client(), format=broken, pipeline=1)
+            broken.resp._thread.join(1)
+            self.assertFalse(broken.resp._thread.is_alive())
+        finally:
+            server.close()
+
+    def test_error_propagation(self):
+        resp = lichess.format.PipelinedResponse(FailingResponse([b'{"id": 1}', b'{"id": 2}']), queue_size=1)
+        objs = lichess.format.JSON.parse(lichess.format.STREAM_OBJECT, resp)
+        self.assertEqual(next(objs), {'id': 1})
+        self.assertEqual(next(objs), {'id': 2})
+        with self.assertRaises(IOError):
+            next(objs)
+        self.assertTrue(resp.closed)
+
+    def test_close_stops_reader(self):
+        inner = FakeResponse([b'x'] * 1000)
+        resp = lichess.format.PipelinedResponse(inner, queue_size=2)
+        with lichess.format.Stream(resp.iter_lines(), resp) as lines:
+            self.assertEqual(next(lines), b'x')
+        resp._thread.join(1)
+        self.assertFalse(resp._thread.is_alive())
+        self.assertTrue(inner.closed)
+
+class FakeTournamentClient(object):
+    """Serves tournament standings pages of 10 players from a list of snapshots, advancing to the next snapshot whenever page 1 is requested."""
+
+    def __init__(self, *snapshots):
+        self.snapshots = snapshots
+        self.current = -1
+        self.pages = []
+
+    def call(self, path, params=None, post_data=None, **kwargs):
+        page = params['page']
+        self.pages.append(page)
+        if page == 1:
+            self.current = min(self.current + 1, len(self.snapshots) - 1)
+        players = self.snapshots[self.current]
+        return {'nbPlayers': len(players), 'isFinished': self.current == len(self.snapshots) - 1,
+                'standing': {'page': page, 'players': players[(page - 1) * 10:page * 10]}}
+
+class TournamentStandingsTestCase(unittest.TestCase):
+
+    def test_concurrent_pages(self):
+        players = [{'name': 'p{}'.format(i), 'rank': i + 1, 'score': 100 - i} for i in range(35)]
+        client = FakeTournamentClient(players)
+        stands = list(lichess.api.tournament_standings('abc', workers=3, client=client))
+        self.assertEqual(stands, players)
+        self.assertEqual(sorted(client.pages), [1, 2, 3, 4, 5])
+
+    def test_concurrent_pages_with_new_players(self):
+        players = [{'name': 'p{}'.format(i), 'rank': i + 1, 'score': 100 - i} for i in range(45)]
+        client = FakeTournamentClient(players)
+        call = client.call
+        # The first page reports 35 players; 10 more join while the other pages are fetched
+        client.call = lambda path, params=None, *args, **kwargs: dict(call(path, params, *args, **kwargs), nbPlayers=35)
+        stands = list(lichess.api.tournament_standings('abc', workers=3, client=client))
+        self.assertEqual(stands, players)
+
+    def test_live_deltas(self):
+        before = [{'name': 'p{}'.format(i), 'rank': i + 1, 'score': 10} for i in range(12)]
+        after = [dict(p) for p in before]
+        after[0], after[1] = dict(after[1], rank=1, score=12), dict(after[0], rank=2)
+        after[10] = {'name': 'new', 'rank': 11, 'score': 10}
+        client = FakeTournamentClient(before, after)
+        changes = list(lichess.api.tournament_standings_live('abc', pages=2, interval=0, client=client))
+        self.assertEqual(len(changes), 2)
+        self.assertEqual(len(changes[0]), 12)
+        by_name = dict((c['name'], c) for c in changes[1])
+        self.assertEqual(sorted(by_name), ['new', 'p0', 'p1', 'p10'])
+        self.assertEqual((by_name['p1']['previousRank'], by_name['p1']['rank'], by_name['p1']['score']), (2, 1, 12))
+        self.assertEqual(by_name['p10']['rank'], None)
+        self.assertEqual(by_name['new']['previousRank'], None)
+
+class RecordsTestCase(unittest.TestCase):
+
+    def test_round_trip(self):
+        game = sample_game('a', 'Cyanfish', 'thibault', winner='white', created_at=1514764800000)
+        resp = FakeResponse([json.dumps(game).encode('utf-8')])
+        record = next(lichess.format.COMPACT.parse(lichess.format.GAME_STREAM_OBJECT, resp))
+        self.assertEqual(record.white.user_id, 'cyanfish')
+        self.assertEqual(record.black.rating, 1600)
+        self.assertEqual(record.to_dict(), game)
+        self.assertEqual(record.to_pgn(), lichess.pgn.from_game(game))
+        self.assertEqual(lichess.pgn.from_game(record), lichess.pgn.from_game(game))
+        self.assertTrue('[White "Cyanfish"]' in record.to_pgn())
+
+    def test_memory(self):
+        lines = [json.dumps(sample_game('g%d' % i, 'cyanfish', 'thibault', created_at=i)) for i in range(2000)]
+        tracemalloc.start()
+        try:
+            base = tracemalloc.get_traced_memory()[0]
+            dicts = [json.loads(line) for line in lines]
+            dict_size = tracemalloc.get_traced_memory()[0] - base
+            del dicts
+            base = tracemalloc.get_traced_memory()[0]
+            records = [lichess.records.GameRecord(json.loads(line)) for line in lines]
+            record_size = tracemalloc.get_traced_memory()[0] - base
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(len(records), 2000)
+        self.assertLess(record_size * 3, dict_size)
+
+class FakeGamesClient(object):
+
+    def __init__(self):
+        self.requested = []
+
+    def call(self, path, params=None, post_data=None, **kwargs):
+        ids = post_data.split(',')
+        self.requested.append(ids)
+        games = [sample_game(i, 'cyanfish', 'thibault') for i in ids if i != 'missing']
+        return iter(reversed(games))
+
+class ObjectStoreTestCase(unittest.TestCase):
+
+    def test_games_by_ids(self):
+        client = FakeGamesClient()
+        store = lichess.store.ObjectStore()
+        games = list(lichess.api.games_by_ids(['a', 'b'], client=client, store=store))
+        self.assertEqual([g['id'] for g in games], ['a', 'b'])
+        games = list(lichess.api.games_by_ids(['c', 'b', 'missing', 'a'], client=client, store=store))
+        self.assertEqual([g['id'] for g in games], ['c', 'b', 'a'])
+        self.assertEqual(client.requested, [['a', 'b'], ['c', 'missing']])
+        list(lichess.api.games_by_ids(['a'], client=client, store=store, format=lichess.format.PGN))
+        self.assertEqual(len(client.requested), 3)
+        list(lichess.api.games_by_ids(['a'], client=client, store=store, evals='true'))
+        self.assertEqual(client.requested[3], ['a'])
+
+    def test_games_by_ids_streams_batches(self):
+        client = FakeGamesClient()
+        store = lichess.store.ObjectStore()
+        store.put_game(sample_game('cached', 'cyanfish', 'thibault'))
+        ids = ['cached'] + ['g%d' % i for i in range(301)]
+        games = lichess.api.games_by_ids(ids, client=client, store=store)
+        self.assertEqual(next(games)['id'], 'cached')
+        self.assertEqual(client.requested, [])
+        self.assertEqual(next(games)['id'], 'g0')
+        self.assertEqual(len(client.requested), 1)
+        self.assertEqual([g['id'] for g in games], ids[2:])
+        self.assertEqual([len(r) for r in client.requested], [300, 1])
+
+    def test_policies(self):
+        store = lichess.store.ObjectStore(max_size=2, user_ttl=-1)
+        store.put_user({'id': 'cyanfish'})
+        self.assertEqual(store.get_user('Cyanfish'), None)
+        store.put_game(dict(sample_game('a', 'cyanfish', 'thibault'), status='started'))
+        self.assertEqual(store.get_game('a'), None)
+        for i in 'bcd':
+            store.put_game(sample_game(i, 'cyanfish', 'thibault'))
+        self.assertEqual(store.get_game('b'), None)
+        self.assertEqual(store.get_game('d')['id'], 'd')
+        store.get_game('d')['players']['white']['rating'] = 0
+        self.assertEqual(store.get_game('d'), sample_game('d', 'cyanfish', 'thibault'))
+
+    def test_disk(self):
+        path = tempfile.mkdtemp()
+        try:
+            store = lichess.store.ObjectStore(path=os.path.join(path, 'store.db'))
+            store.put_game(sample_game('a', 'cyanfish', 'thibault'))
+            store.disk.close()
+            store = lichess.store.ObjectStore(path=os.path.join(path, 'store.db'))
+            self.assertEqual(store.get_game('a'), sample_game('a', 'cyanfish', 'thibault'))
+            store.disk.close()
+        finally:
+            shutil.rmtree(path)
+
+class BoardTensorTestCase(unittest.TestCase):
+
+    def test_write_and_load(self):
+        path = tempfile.mkdtemp()
+        try:
+            pgn = lichess.pgn.from_game(sample_game('b', 'cyanfish', 'thibault', winner='black', moves='f3 e5 g4 Qh4#'))
+            with lichess.tensors.BoardTensorWriter(path, batch_size=1) as writer:
+                self.assertEqual(writer.write([sample_game('a', 'cyanfish', 'thibault', winner='white'), pgn]), 10)
+            with lichess.tensors.BoardTensorWriter(path) as writer:
+                writer.write([sample_game('c', 'cyanfish', 'thibault', moves='e4 e5'), dict(sample_game('d', 'cyanfish', 'thibault'), status='started')])
+            data = lichess.tensors.load(path)
+            self.assertEqual(data['planes'].shape, (12, 12, 64))
+            self.assertEqual(list(data['games']), [0, 6, 10])
+            self.assertEqual(list(data['outcomes']), [1] * 6 + [-1] * 4 + [0] * 2)
+            start = data['planes'][0]
+            self.assertEqual(list(start[lichess.tensors.PIECE_PLANES.index('P')].nonzero()[0]), list(range(8, 16)))
+            self.assertEqual(list(start[lichess.tensors.PIECE_PLANES.index('k')].nonzero()[0]), [chess.E8])
+            self.assertEqual(list(data['meta'][0]), [1, 1, 1, 1, 1, -1])
+            self.assertEqual(list(data['meta'][2]), [1, 1, 1, 1, 1, chess.square_file(chess.E6)])
+            self.assertEqual(data['moves'][0], chess.E2 | chess.E4 << 6)
+        finally:
+            shutil.rmtree(path)
+
+class AnalyticsTestCase(unittest.TestCase):
+
+    def test_player_stats(self):
+        games = [
+            sample_game('a', 'cyanfish', 'thibault', winner='white', created_at=3),
+            sample_game('b', 'thibault', 'cyanfish', winner='white', created_at=1, eco='B12'),
+            sample_game('c', 'Cyanfish', 'thibault', speed='rapid', created_at=2),
+            sample_game('d', 'thibault', 'someone', created_at=4),
+        ]
+        stats = lichess.analytics.PlayerStats('cyanfish', batch_size=2)
+        stats.update(games[:2])
+        stats.update(games[2:])
+        blitz = lichess.analytics.SPEEDS.index('blitz')
+        rapid = lichess.analytics.SPEEDS.index('rapid')
+        self.assertEqual(stats.games, 3)
+        self.assertEqual(list(stats.results[lichess.analytics.WHITE, blitz]), [1, 0, 0])
+        self.assertEqual(list(stats.results[lichess.analytics.BLACK, blitz]), [0, 0, 1])
+        self.assertEqual(list(stats.results[lichess.analytics.WHITE, rapid]), [0, 1, 0])
+        self.assertEqual(stats.top_openings(), [('C50', 2), ('B12', 1)])
+        times, ratings = stats.rating_history()
+        self.assertEqual(list(times), [1, 2, 3])
+        self.assertEqual(list(ratings), [1600, 1502, 1503])
+        times, ratings = stats.rating_history('rapid')
+        self.assertEqual(list(times), [2])
+
+class PositionIndexTestCase(unittest.TestCase):
+
+    def test_lookup(self):
+        italian = 'r1bqk1nr/pppp1ppp/2n5/2b1p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4'
+        index = lichess.positions.PositionIndex()
+        added = index.add_games([
+            sample_game('a', 'cyanfish', 'thibault'),
+            sample_game('b', 'cyanfish', 'thibault', moves='e4 e5 Bc4 Bc5 Nf3 Nc6'),
+            sample_game('c', 'cyanfish', 'thibault', moves='d4 d5'),
+            sample_game('a', 'cyanfish', 'thibault'),
+            sample_game('bad', 'cyanfish', 'thibault', moves='e4 e5 Qxx7'),
+        ])
+        self.assertEqual(added, 3)
+        self.assertNotIn('bad', index.game_ids)
+        self.assertEqual(index.games_reaching(italian), ['a', 'b'])
+        self.assertEqual(index.lookup(italian), [('a', 6), ('b', 6)])
+        self.assertEqual(len(index.lookup(chess.STARTING_FEN)), 3)
+
+        path = tempfile.mkdtemp()
+        try:
+            index.save(path)
+            loaded = lichess.positions.PositionIndex.load(path)
+            loaded.add_games([sample_game('d', 'cyanfish', 'thibault', moves='Nf3 Nc6 e4 e5 Bc4 Bc5')])
+            self.assertEqual(loaded.games_reaching(italian), ['a', 'b', 'd'])
+            self.assertIsInstance(loaded._base[0], numpy.memmap)
+            loaded.add_games([sample_game('e', 'cyanfish', 'thibault', moves='e4 e5 Nf3 Nc6 Bc4 Bc5 c3')])
+            self.assertEqual(loaded.lookup(italian), [('a', 6), ('b', 6), ('d', 6), ('e', 6)])
+            loaded.save(path)
+            self.assertEqual(len(lichess.positions.PositionIndex.load(path)), len(index) + 15)
+            self.assertEqual(lichess.positions.PositionIndex.load(path).games_reaching(italian), ['a', 'b', 'd', 'e'])
+        finally:
+            shutil.rmtree(path)
+
 if __name__ == '__main__':
     unittest.main()